@@ -5,6 +5,7 @@ Generates personalized explanations based on actual plot data values
 """
 
 import json
+import heapq
 import requests
 import pandas as pd
 import numpy as np
@@ -13,6 +14,9 @@ from typing import Dict, Any, Optional, List, Tuple
 import sys
 import openpyxl
 
+class FallbackText(str):
+    """Analysis text written without the LLM (Ollama unavailable or failing)"""
+
 class RealTimeMicrobiomeAnalyzer:
     def __init__(self, ollama_url: str = "http://localhost:11434", model: str = "gpt-oss:20b"):
         self.ollama_url = ollama_url
@@ -31,6 +35,19 @@ class RealTimeMicrobiomeAnalyzer:
             7: "all_child-UC_kraken2_250616_level_7.tsv"
         }
     
+    def source_files(self) -> List[str]:
+        """
+        List the input files every analysis is derived from
+        """
+        return [self.metadata_file, *self.level_files.values()]
+    
+    def source_fingerprint(self) -> tuple:
+        """
+        Fingerprint the input files by modification time (None for a missing file),
+        for keying caches of anything derived from them
+        """
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in self.source_files())
+    
     def extract_alpha_diversity_data(self, taxonomic_level: str) -> Dict[str, float]:
         """
         Extract actual alpha diversity values from the data files
@@ -335,7 +352,24 @@ class RealTimeMicrobiomeAnalyzer:
             taxonomic_level: Taxonomic level to analyze
             
         Returns:
-            Excel file as bytes
+            Excel file as bytes (a no-data/error workbook when the table cannot be built)
+        """
+        from io import BytesIO
+        output = BytesIO()
+        self.write_taxa_comparison_excel(taxonomic_level, output)
+        return output.getvalue()
+
+    def write_taxa_comparison_excel(self, taxonomic_level: str, output) -> bool:
+        """
+        Save the taxa comparison workbook into a binary file object
+        
+        Args:
+            taxonomic_level: Taxonomic level to analyze
+            output: Seekable binary file object to save the workbook into
+            
+        Returns:
+            True when the comparison table was written, False when a no-data/error
+            workbook was written instead
         """
         try:
             taxa_data = self.calculate_taxa_control_uc_ratios(taxonomic_level)
@@ -346,7 +380,8 @@ class RealTimeMicrobiomeAnalyzer:
                 ws = wb.active
                 ws.title = "Taxa Comparison"
                 ws['A1'] = "No data available for the specified taxonomic level."
-                return wb.save()
+                wb.save(output)
+                return False
             
             # Create Excel workbook
             wb = openpyxl.Workbook()
@@ -383,12 +418,9 @@ class RealTimeMicrobiomeAnalyzer:
                 adjusted_width = min(max_length + 2, 50)
                 ws.column_dimensions[column_letter].width = adjusted_width
             
-            # Save to bytes
-            from io import BytesIO
-            output = BytesIO()
+            # Save the workbook
             wb.save(output)
-            output.seek(0)
-            return output.getvalue()
+            return True
             
         except Exception as e:
             print(f"Error generating Excel: {e}")
@@ -396,10 +428,10 @@ class RealTimeMicrobiomeAnalyzer:
             wb = openpyxl.Workbook()
             ws = wb.active
             ws['A1'] = f"Error generating Excel: {e}"
-            output = BytesIO()
-            wb.save(output)
             output.seek(0)
-            return output.getvalue()
+            output.truncate()
+            wb.save(output)
+            return False
 
     def analyze_taxon_plot(self, taxon_name: str, sample_data: Dict[str, float], 
                           sample_names: list, rpm_values: list) -> str:
@@ -646,13 +678,13 @@ Keep it under 150 words, simple language, and focus on the specific data provide
         control_avg = sum(control_values) / len(control_values) if control_values else 0
         uc_avg = sum(uc_values) / len(uc_values) if uc_values else 0
         
-        return f"""This plot shows {taxon_name} abundance across your samples. 
+        return FallbackText(f"""This plot shows {taxon_name} abundance across your samples. 
 
 Control samples show an average of {control_avg:.3f} RPM, while UC samples show {uc_avg:.3f} RPM. 
 
 The difference suggests {taxon_name} may be {'higher' if uc_avg > control_avg else 'lower'} in your condition compared to healthy controls. This could indicate changes in your gut microbiome that may be related to your health status.
 
-Consult with your healthcare provider about what these specific levels mean for your individual case."""
+Consult with your healthcare provider about what these specific levels mean for your individual case.""")
     
     def _generate_fallback_diversity_analysis(self, plot_type: str, diversity_data: Dict[str, float]) -> str:
         """
@@ -677,13 +709,13 @@ Consult with your healthcare provider about what these specific levels mean for
         control_avg = sum(d for _, d in control_samples) / len(control_samples) if control_samples else 0
         uc_avg = sum(d for _, d in uc_samples) / len(uc_samples) if uc_samples else 0
         
-        return f"""This {plot_type} diversity plot shows how diverse your gut microbiome is across samples.
+        return FallbackText(f"""This {plot_type} diversity plot shows how diverse your gut microbiome is across samples.
 
 Your average diversity is {avg_diversity:.3f}. {'Higher diversity generally indicates a healthier, more balanced microbiome.' if avg_diversity > 3.0 else 'Lower diversity may suggest your microbiome needs support to become more balanced.'}
 
 Control samples show an average diversity of {control_avg:.3f}, while UC samples show {uc_avg:.3f}. This comparison helps identify how your condition may affect microbiome diversity.
 
-The specific values for each sample help identify which areas of your gut may need attention. Discuss these results with your healthcare provider for personalized recommendations."""
+The specific values for each sample help identify which areas of your gut may need attention. Discuss these results with your healthcare provider for personalized recommendations.""")
     
     def _generate_fallback_stacked_analysis(self, plot_type: str, top_taxa: list, abundances: Dict[str, list]) -> str:
         """
@@ -698,13 +730,13 @@ The specific values for each sample help identify which areas of your gut may ne
         # Get top 5 most abundant taxa
         top_5_taxa = sorted(taxon_totals.items(), key=lambda x: x[1], reverse=True)[:5]
         
-        return f"""This {plot_type} plot shows the composition of your gut microbiome, highlighting the most abundant bacteria groups.
+        return FallbackText(f"""This {plot_type} plot shows the composition of your gut microbiome, highlighting the most abundant bacteria groups.
 
 The top taxa in your samples include: {', '.join([t[0] for t in top_5_taxa])}.
 
 This visualization helps identify which bacteria are dominant in your gut and how they compare between samples. The patterns can reveal important information about your microbiome balance and health status.
 
-Discuss these specific results with your healthcare provider for personalized insights."""
+Discuss these specific results with your healthcare provider for personalized insights.""")
     
     def _generate_fallback_pcoa_analysis(self, plot_type: str, abundances: Dict[str, list]) -> str:
         """
@@ -723,14 +755,14 @@ Discuss these specific results with your healthcare provider for personalized in
             else:
                 uc_samples.append(sample)
         
-        return f"""This PCoA plot shows how similar or different your microbiome is compared to others.
+        return FallbackText(f"""This PCoA plot shows how similar or different your microbiome is compared to others.
 
 Control samples: {', '.join(control_samples)}
 UC samples: {', '.join(uc_samples)}
 
 This visualization helps identify if people with the same health condition have similar gut microbiomes, which could help develop treatments or understand how the disease affects the gut.
 
-The plot shows the relationships between samples based on their microbial composition, helping to identify patterns that may be related to health status."""
+The plot shows the relationships between samples based on their microbial composition, helping to identify patterns that may be related to health status.""")
 
     def generate_ai_summary(self, taxonomic_level: str, report_type: str = "technical") -> str:
         """
@@ -747,14 +779,14 @@ The plot shows the relationships between samples based on their microbial compos
             taxa_data = self.calculate_taxa_control_uc_ratios(taxonomic_level)
             
             if not taxa_data:
-                return "No data available for analysis."
+                return FallbackText("No data available for analysis.")
             
             # Calculate diversity metrics
             control_diversity = self._calculate_shannon_diversity([t['control_avg'] for t in taxa_data])
             uc_diversity = self._calculate_shannon_diversity([t['uc_avg'] for t in taxa_data])
             
             # Find top 20 most distinct taxa
-            top_taxa = sorted(taxa_data, key=lambda x: abs(x['control_uc_ratio'] - 1) if x['control_uc_ratio'] != float('inf') else 0, reverse=True)[:20]
+            top_taxa = heapq.nlargest(20, taxa_data, key=lambda x: abs(x['control_uc_ratio'] - 1) if x['control_uc_ratio'] != float('inf') else 0)
             
             # Prepare data for AI analysis
             analysis_data = {
@@ -777,7 +809,7 @@ The plot shows the relationships between samples based on their microbial compos
         except Exception as e:
             print(f"Error generating AI summary: {e}")
             # Return a helpful error message with setup instructions
-            return f"""
+            return FallbackText(f"""
             **Error Generating AI Summary:**
             
             An error occurred while generating the AI summary: {e}
@@ -789,7 +821,7 @@ The plot shows the relationships between samples based on their microbial compos
             
             **Alternative:**
             The system will generate a fallback summary with basic analysis.
-            """
+            """)
     
     def _calculate_shannon_diversity(self, abundances: List[float]) -> float:
         """Calculate Shannon diversity index"""
@@ -948,7 +980,7 @@ The plot shows the relationships between samples based on their microbial compos
             **Note:** This is a fallback summary generated when the AI service is unavailable. For enhanced AI-powered analysis, please ensure Ollama is running with the gpt-oss:20b model.
             """
             
-            return summary
+            return FallbackText(summary)
             
         except Exception as e:
             return f"Error generating fallback summary: {e}"
@@ -991,9 +1023,8 @@ The plot shows the relationships between samples based on their microbial compos
                 return {}
             
             # Get top 20 most distinct taxa
-            top_taxa = sorted(taxa_data, 
-                             key=lambda x: abs(x['control_uc_ratio'] - 1) if x['control_uc_ratio'] != float('inf') else 0, 
-                             reverse=True)[:20]
+            top_taxa = heapq.nlargest(20, taxa_data, 
+                                      key=lambda x: abs(x['control_uc_ratio'] - 1) if x['control_uc_ratio'] != float('inf') else 0)
             
             # Prepare heatmap data
             heatmap_data = {
@@ -11,6 +11,19 @@ import os
 import requests
 from typing import Dict, Any
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _write_json(obj):
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+except ImportError:
+    _json_loads = json.loads
+    
+    def _write_json(obj):
+        print(json.dumps(obj))
+
 # Add parent directory to path to import our analyzer
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -69,15 +82,20 @@ def main():
             # This would typically come from the frontend with the current plot data
             # For now, we'll use a placeholder approach
             
-            # Get sample data from form (frontend should send this)
-            sample_data_json = form.getvalue('sample_data', '{}')
-            sample_names_json = form.getvalue('sample_names', '[]')
-            rpm_values_json = form.getvalue('rpm_values', '[]')
+            # Get sample data from form (frontend should send this), either as one
+            # combined payload field or as the older separately encoded fields
+            payload_json = form.getvalue('payload')
             
             try:
-                sample_data = json.loads(sample_data_json)
-                sample_names = json.loads(sample_names_json)
-                rpm_values = json.loads(rpm_values_json)
+                if payload_json is not None:
+                    payload = _json_loads(payload_json)
+                    sample_data = payload.get('sample_data', {})
+                    sample_names = payload.get('sample_names', [])
+                    rpm_values = payload.get('rpm_values', [])
+                else:
+                    sample_data = _json_loads(form.getvalue('sample_data', '{}'))
+                    sample_names = _json_loads(form.getvalue('sample_names', '[]'))
+                    rpm_values = _json_loads(form.getvalue('rpm_values', '[]'))
             except json.JSONDecodeError:
                 # Fallback to empty data
                 sample_data = {}
@@ -171,7 +189,7 @@ def main():
             }
         
         # Return JSON response
-        print(json.dumps(response))
+        _write_json(response)
         
     except Exception as e:
         # Error response
@@ -180,7 +198,7 @@ def main():
             'error': str(e),
             'type': 'server_error'
         }
-        print(json.dumps(error_response))
+        _write_json(error_response)
 
 if __name__ == "__main__":
     main()
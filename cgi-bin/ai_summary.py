@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-CGI script for generating AI-powered summary reports
+CGI script for generating AI-powered summary reports.
+Also exposes a WSGI `application` so a persistent server can reuse the analyzer.
 """
 
 import cgi
@@ -8,6 +9,10 @@ import json
 import sys
 import os
 import base64
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from io import BytesIO
 
 # Add parent directory to path to import our modules
@@ -15,10 +20,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     from ai_realtime_analyzer import RealTimeMicrobiomeAnalyzer
-    import matplotlib.pyplot as plt
     import matplotlib
     matplotlib.use('Agg')  # Use non-interactive backend
-    import seaborn as sns
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
     import numpy as np
     from reportlab.lib.pagesizes import letter, A4
     from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
@@ -33,48 +38,55 @@ except ImportError as e:
     print(json.dumps({"success": False, "error": f"Import error: {e}"}))
     sys.exit(1)
 
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
+
+# Reuse one figure/canvas pair per thread instead of creating a new pyplot
+# figure (and Agg renderer) for every call; plots are rendered concurrently,
+# so each worker thread needs its own figure
+_local = threading.local()
+
+def _get_figure():
+    """Return this thread's cleared Figure, creating it on first use"""
+    fig = getattr(_local, 'fig', None)
+    if fig is None:
+        fig = Figure(figsize=(10, 6))
+        FigureCanvasAgg(fig)
+        _local.fig = fig
+    fig.clf()
+    return fig
+
+# Shared pool for the plot and table work in create_pdf_report; created on first use so
+# the CGI path does not start threads it never needs. Reusing its threads keeps their
+# thread-local figures alive between reports
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Return the module's report worker pool, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='pdf-report')
+        return _executor
+
+def _render_png(fig):
+    """Render the figure to PNG bytes"""
+    # reportlab decodes and recompresses the image when embedding it,
+    # so spend as little time as possible on PNG compression here
+    img_buffer = BytesIO()
+    fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight',
+                pil_kwargs={'compress_level': 1})
+    return img_buffer.getvalue()
+
 def generate_diversity_plot(analyzer, taxonomic_level):
     """Generate diversity comparison plot"""
     try:
-        plot_data = analyzer.generate_diversity_plot(taxonomic_level)
-        
-        if not plot_data:
-            return None
-            
-        # Create the plot
-        plt.figure(figsize=(10, 6))
-        
-        # Bar plot for diversity comparison
-        bars = plt.bar(plot_data['labels'], plot_data['diversity_values'], 
-                      color=['#3b82f6', '#ef4444'], alpha=0.8)
-        
-        # Add value labels on bars
-        for bar, value in zip(bars, plot_data['diversity_values']):
-            plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.01,
-                    f'{value:.3f}', ha='center', va='bottom', fontweight='bold')
-        
-        plt.title(f'Shannon Diversity Comparison - {taxonomic_level.title()} Level', 
-                 fontsize=16, fontweight='bold', pad=20)
-        plt.ylabel('Shannon Diversity Index', fontsize=12)
-        plt.xlabel('Sample Group', fontsize=12)
-        plt.ylim(0, max(plot_data['diversity_values']) * 1.2)
-        
-        # Add sample count annotations
-        for i, (label, count) in enumerate(zip(plot_data['labels'], plot_data['sample_counts'])):
-            plt.text(i, 0.05, f'n={count}', ha='center', va='bottom', 
-                    fontsize=10, style='italic')
-        
-        plt.grid(axis='y', alpha=0.3)
-        plt.tight_layout()
-        
-        # Save to bytes
-        img_buffer = BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
-        
-        return img_buffer.getvalue()
-        
+        return _diversity_png(analyzer, taxonomic_level, analyzer.source_fingerprint())
     except Exception as e:
         print(f"Error generating diversity plot: {e}", file=sys.stderr)
         return None
@@ -82,59 +94,123 @@ def generate_diversity_plot(analyzer, taxonomic_level):
 def generate_heatmap(analyzer, taxonomic_level):
     """Generate heatmap for top 20 most distinct taxa"""
     try:
-        heatmap_data = analyzer.generate_heatmap_data(taxonomic_level)
-        
-        if not heatmap_data:
-            return None
-            
-        # Create DataFrame for heatmap
-        df = pd.DataFrame({
-            'Taxon': heatmap_data['taxa'],
-            'Control': heatmap_data['control_values'],
-            'UC': heatmap_data['uc_values']
-        })
-        
-        # Set index to taxa names
-        df.set_index('Taxon', inplace=True)
-        
-        # Create the heatmap
-        plt.figure(figsize=(12, 10))
-        
-        # Normalize data for better visualization
-        df_normalized = df.div(df.max(axis=1), axis=0)
-        
-        # Create heatmap
-        sns.heatmap(df_normalized, 
-                   annot=True, 
-                   fmt='.2f',
-                   cmap='RdYlBu_r',
-                   cbar_kws={'label': 'Normalized Abundance'},
-                   linewidths=0.5,
-                   square=True)
-        
-        plt.title(f'Top 20 Most Distinct Taxa - {taxonomic_level.title()} Level\n(Normalized Abundance)', 
-                 fontsize=16, fontweight='bold', pad=20)
-        plt.xlabel('Sample Group', fontsize=12)
-        plt.ylabel('Taxa', fontsize=12)
-        
-        # Rotate x-axis labels
-        plt.xticks(rotation=0)
-        
-        # Adjust layout
-        plt.tight_layout()
-        
-        # Save to bytes
-        img_buffer = BytesIO()
-        plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-        img_buffer.seek(0)
-        plt.close()
-        
-        return img_buffer.getvalue()
-        
+        return _heatmap_png(analyzer, taxonomic_level, analyzer.source_fingerprint())
     except Exception as e:
         print(f"Error generating heatmap: {e}", file=sys.stderr)
         return None
 
+@lru_cache(maxsize=32)
+def _diversity_png(analyzer, taxonomic_level, data_hash):
+    """
+    Render the diversity comparison plot; cached per level and input fingerprint.
+    Raises on failure so that only successful renders are cached
+    """
+    plot_data = analyzer.generate_diversity_plot(taxonomic_level)
+    
+    if not plot_data:
+        raise ValueError(f"No diversity data for {taxonomic_level}")
+    
+    # Display-only values, float32 is plenty for the 3-decimal labels
+    diversity_values = np.asarray(plot_data['diversity_values'], dtype=np.float32)
+        
+    # Create the plot
+    fig = _get_figure()
+    fig.set_size_inches(10, 6)
+    ax = fig.add_subplot(111)
+    
+    # Bar plot for diversity comparison
+    bars = ax.bar(plot_data['labels'], diversity_values, 
+                  color=['#3b82f6', '#ef4444'], alpha=0.8)
+    
+    # Add value labels on bars
+    for bar, value in zip(bars, diversity_values):
+        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.01,
+                f'{value:.3f}', ha='center', va='bottom', fontweight='bold')
+    
+    ax.set_title(f'Shannon Diversity Comparison - {taxonomic_level.title()} Level', 
+                 fontsize=16, fontweight='bold', pad=20)
+    ax.set_ylabel('Shannon Diversity Index', fontsize=12)
+    ax.set_xlabel('Sample Group', fontsize=12)
+    ax.set_ylim(0, float(diversity_values.max()) * 1.2)
+    
+    # Add sample count annotations
+    for i, (label, count) in enumerate(zip(plot_data['labels'], plot_data['sample_counts'])):
+        ax.text(i, 0.05, f'n={count}', ha='center', va='bottom', 
+                fontsize=10, style='italic')
+    
+    ax.grid(axis='y', alpha=0.3)
+    fig.tight_layout()
+    
+    # Save to bytes
+    return _render_png(fig)
+
+@lru_cache(maxsize=32)
+def _heatmap_png(analyzer, taxonomic_level, data_hash):
+    """
+    Render the top 20 taxa heatmap; cached per level and input fingerprint.
+    Raises on failure so that only successful renders are cached
+    """
+    heatmap_data = analyzer.generate_heatmap_data(taxonomic_level)
+    
+    if not heatmap_data:
+        raise ValueError(f"No heatmap data for {taxonomic_level}")
+        
+    # Create DataFrame for heatmap
+    df = pd.DataFrame({
+        'Taxon': heatmap_data['taxa'],
+        'Control': heatmap_data['control_values'],
+        'UC': heatmap_data['uc_values']
+    })
+    
+    # Set index to taxa names
+    df.set_index('Taxon', inplace=True)
+    df = df.astype(np.float32)
+    
+    # Create the heatmap
+    fig = _get_figure()
+    fig.set_size_inches(12, 10)
+    ax = fig.add_subplot(111)
+    
+    # Normalize data for better visualization
+    df_normalized = df.div(df.max(axis=1), axis=0)
+    
+    # Create heatmap
+    mat = df_normalized.values
+    im = ax.imshow(mat, cmap='RdYlBu_r', aspect='equal')
+    fig.colorbar(im, ax=ax, label='Normalized Abundance')
+    
+    ax.set_xticks(range(len(df_normalized.columns)))
+    ax.set_xticklabels(df_normalized.columns)
+    ax.set_yticks(range(len(df_normalized.index)))
+    ax.set_yticklabels(df_normalized.index)
+    
+    # Cell borders
+    ax.set_xticks(np.arange(mat.shape[1] + 1) - 0.5, minor=True)
+    ax.set_yticks(np.arange(mat.shape[0] + 1) - 0.5, minor=True)
+    ax.grid(which='minor', color='white', linewidth=0.5)
+    ax.tick_params(which='minor', length=0)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    
+    # Annotate cells, using light text on the dark ends of the colormap
+    for (i, j), value in np.ndenumerate(mat):
+        ax.text(j, i, f'{value:.2f}', ha='center', va='center',
+                color='white' if value < 0.25 or value > 0.75 else 'black')
+    
+    ax.set_title(f'Top 20 Most Distinct Taxa - {taxonomic_level.title()} Level\n(Normalized Abundance)', 
+                 fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Sample Group', fontsize=12)
+    ax.set_ylabel('Taxa', fontsize=12)
+    
+    # Rotate x-axis labels
+    ax.tick_params(axis='x', labelrotation=0)
+    
+    # Adjust layout
+    fig.tight_layout()
+    
+    # Save to bytes
+    return _render_png(fig)
+
 def create_pdf_report(analyzer, taxonomic_level, report_type, ai_summary):
     """Create PDF report with AI summary and visualizations"""
     try:
@@ -191,8 +267,16 @@ def create_pdf_report(analyzer, taxonomic_level, report_type, ai_summary):
         story.append(Paragraph(ai_summary, body_style))
         story.append(Spacer(1, 20))
         
-        # Generate and add diversity plot
-        diversity_img = generate_diversity_plot(analyzer, taxonomic_level)
+        # Plots and the ratio table are independent, so compute them concurrently
+        executor = _get_executor()
+        diversity_future = executor.submit(generate_diversity_plot, analyzer, taxonomic_level)
+        heatmap_future = executor.submit(generate_heatmap, analyzer, taxonomic_level)
+        taxa_future = executor.submit(analyzer.calculate_taxa_control_uc_ratios, taxonomic_level)
+        diversity_img = diversity_future.result()
+        heatmap_img = heatmap_future.result()
+        taxa_data = taxa_future.result()
+        
+        # Add diversity plot
         if diversity_img:
             img_buffer = BytesIO(diversity_img)
             img = Image(img_buffer, width=6*inch, height=4*inch)
@@ -200,8 +284,7 @@ def create_pdf_report(analyzer, taxonomic_level, report_type, ai_summary):
             story.append(img)
             story.append(Spacer(1, 20))
         
-        # Generate and add heatmap
-        heatmap_img = generate_heatmap(analyzer, taxonomic_level)
+        # Add heatmap
         if heatmap_img:
             img_buffer = BytesIO(heatmap_img)
             img = Image(img_buffer, width=6*inch, height=5*inch)
@@ -213,11 +296,9 @@ def create_pdf_report(analyzer, taxonomic_level, report_type, ai_summary):
         story.append(Paragraph("Summary Table", heading_style))
         
         # Get top 20 taxa data
-        taxa_data = analyzer.calculate_taxa_control_uc_ratios(taxonomic_level)
         if taxa_data:
-            top_20 = sorted(taxa_data, 
-                           key=lambda x: abs(x['control_uc_ratio'] - 1) if x['control_uc_ratio'] != float('inf') else 0, 
-                           reverse=True)[:20]
+            top_20 = heapq.nlargest(20, taxa_data, 
+                                    key=lambda x: abs(x['control_uc_ratio'] - 1) if x['control_uc_ratio'] != float('inf') else 0)
             
             # Create table data
             table_data = [['Rank', 'Taxon', 'Control Avg', 'UC Avg', 'UC StdDev', 'Ratio']]
@@ -264,56 +345,72 @@ def create_pdf_report(analyzer, taxonomic_level, report_type, ai_summary):
         print(f"Error creating PDF: {e}", file=sys.stderr)
         return None
 
-def main():
-    """Main CGI function"""
+@lru_cache(maxsize=1)
+def get_analyzer():
+    """Return the process-wide analyzer, creating it on first use"""
+    return RealTimeMicrobiomeAnalyzer()
+
+def generate_summary_response(taxonomic_level, report_type='technical'):
+    """Generate the AI summary and PDF report, returning the JSON response dict"""
     try:
-        # Set content type
-        print("Content-Type: application/json")
-        print()
-        
-        # Parse form data
-        form = cgi.FieldStorage()
-        
-        # Get parameters
-        taxonomic_level = form.getvalue('taxonomic_level')
-        report_type = form.getvalue('report_type', 'technical')
-        
         if not taxonomic_level:
-            print(json.dumps({"success": False, "error": "Missing taxonomic_level parameter"}))
-            return
+            return {"success": False, "error": "Missing taxonomic_level parameter"}
         
-        # Initialize analyzer
-        analyzer = RealTimeMicrobiomeAnalyzer()
+        # Reuse the cached analyzer
+        analyzer = get_analyzer()
         
         # Generate AI summary
         ai_summary = analyzer.generate_ai_summary(taxonomic_level, report_type)
         
         if not ai_summary or ai_summary.startswith("Error"):
-            print(json.dumps({"success": False, "error": ai_summary}))
-            return
+            return {"success": False, "error": ai_summary}
         
         # Create PDF report
         pdf_content = create_pdf_report(analyzer, taxonomic_level, report_type, ai_summary)
         
         if not pdf_content:
-            print(json.dumps({"success": False, "error": "Failed to generate PDF"}))
-            return
+            return {"success": False, "error": "Failed to generate PDF"}
         
         # Encode PDF content
         pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
         
         # Return success response
-        response = {
+        return {
             "success": True,
             "message": f"AI summary generated successfully for {taxonomic_level} level",
             "report_type": report_type,
             "pdf_data": pdf_base64
         }
         
-        print(json.dumps(response))
-        
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
+        return {"success": False, "error": str(e)}
+
+def application(environ, start_response):
+    """WSGI entry point, so a long-lived server keeps the analyzer loaded between requests"""
+    form = cgi.FieldStorage(fp=environ.get('wsgi.input'), environ=environ, keep_blank_values=True)
+    response = generate_summary_response(form.getvalue('taxonomic_level'),
+                                         form.getvalue('report_type', 'technical'))
+    body = _json_dumps(response)
+    start_response('200 OK', [('Content-Type', 'application/json'),
+                              ('Content-Length', str(len(body)))])
+    return [body]
+
+def main():
+    """Main CGI function"""
+    # Set content type
+    print("Content-Type: application/json")
+    print()
+    
+    # Parse form data
+    form = cgi.FieldStorage()
+    
+    # Get parameters
+    taxonomic_level = form.getvalue('taxonomic_level')
+    report_type = form.getvalue('report_type', 'technical')
+    
+    response = generate_summary_response(taxonomic_level, report_type)
+    sys.stdout.flush()
+    sys.stdout.buffer.write(_json_dumps(response) + b"\n")
 
 if __name__ == "__main__":
     main()
@@ -8,6 +8,12 @@ import json
 import webbrowser
 from pathlib import Path
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 def demo_ai_explainer():
     """Demonstrate the AI explainer system"""
     
@@ -22,8 +28,7 @@ def demo_ai_explainer():
     
     # Load explanations
     try:
-        with open("plot_explanations.json", 'r') as f:
-            explanations = json.load(f)
+        explanations = _json_loads(Path("plot_explanations.json").read_bytes())
         print(f"✅ Loaded {len(explanations)} AI-generated explanations")
     except Exception as e:
         print(f"❌ Error loading explanations: {e}")
@@ -4,11 +4,15 @@ Script to extract taxa information from Kraken2 TSV files and convert to RPM
 for the interactive visualization dropdowns.
 """
 
-import pandas as pd
+import pyarrow.csv as pacsv
+import pyarrow.compute as pc
 import json
 import sys
 import os
 
+# Taxonomic level prefixes, indexed by level number - 2 (phylum..species)
+_LEVEL_PREFIXES = ('p__', 'c__', 'o__', 'f__', 'g__', 's__')
+
 def convert_to_rpm(df):
     """Convert read counts to reads per million (RPM)"""
     # Sum all reads per sample
@@ -19,45 +23,29 @@ def convert_to_rpm(df):
         rpm_df[col] = (df[col] / sample_sums[col]) * 1000000
     return rpm_df
 
+def read_level_table(level_file):
+    """Read a taxonomic level TSV into an Arrow table"""
+    return pacsv.read_csv(level_file, parse_options=pacsv.ParseOptions(delimiter='\t'))
+
 def extract_taxa_by_level(level_file, level_num):
     """Extract taxa names from a specific taxonomic level file"""
     if not os.path.exists(level_file):
         return []
     
-    # Read the TSV file with headers
-    df = pd.read_csv(level_file, sep='\t')
-    
-    # Define taxonomic level patterns
-    level_patterns = {
-        2: 'p__',  # Phylum
-        3: 'c__',  # Class
-        4: 'o__',  # Order
-        5: 'f__',  # Family
-        6: 'g__',  # Genus
-        7: 's__'   # Species
-    }
-    
-    if level_num not in level_patterns:
+    if not 2 <= level_num <= 7:
         return []
     
-    pattern = level_patterns[level_num]
+    pattern = _LEVEL_PREFIXES[level_num - 2]
+    
+    # Read the TSV file with headers
+    taxa_col = read_level_table(level_file).column('Taxa')
     
     # Filter rows that contain the pattern
-    taxa_rows = df[df['Taxa'].str.contains(pattern, na=False)]
-    
-    # Extract taxa names (extract just the part after the pattern)
-    taxa_names = []
-    for _, row in taxa_rows.iterrows():
-        taxon = row['Taxa']
-        # Find the pattern and extract the taxon name
-        if pattern in taxon:
-            # Split by '|' and find the part that starts with our pattern
-            parts = taxon.split('|')
-            for part in parts:
-                if part.startswith(pattern):
-                    clean_name = part.replace(pattern, '')
-                    taxa_names.append(clean_name)
-                    break
+    filtered = taxa_col.filter(pc.match_substring(taxa_col, pattern))
+    
+    # Extract taxa names (the part of the first '|'-separated field starting with the pattern)
+    extracted = pc.extract_regex(filtered, rf'(?:^|\|){pattern}(?P<name>[^|]*)')
+    taxa_names = [name for name in extracted.combine_chunks().field('name').to_pylist() if name is not None]
     
     return sorted(list(set(taxa_names)))  # Remove duplicates and sort
 
@@ -69,22 +57,12 @@ def get_taxa_data(level_num, selected_taxon):
         return None
     
     # Read the TSV file with headers
-    df = pd.read_csv(level_file, sep='\t')
-    
-    # Define taxonomic level patterns
-    level_patterns = {
-        2: 'p__',  # Phylum
-        3: 'c__',  # Class
-        4: 'o__',  # Order
-        5: 'f__',  # Family
-        6: 'g__',  # Genus
-        7: 's__'   # Species
-    }
+    df = read_level_table(level_file).to_pandas()
     
-    if level_num not in level_patterns:
+    if not 2 <= level_num <= 7:
         return None
     
-    pattern = level_patterns[level_num]
+    pattern = _LEVEL_PREFIXES[level_num - 2]
     
     # Find the row with the selected taxon
     taxon_row = df[df['Taxa'].str.contains(f"{pattern}{selected_taxon}", na=False)]
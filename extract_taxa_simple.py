@@ -6,9 +6,21 @@ for the interactive visualization dropdowns. Uses only standard library modules.
 
 import csv
 import json
+import mmap
+import re
 import sys
 import os
 
+# Per-level subtables written by parse_taxa.py
+LEVEL_FILE_TEMPLATE = "all_child-UC_kraken2_250616_level_{}.tsv"
+
+# Taxonomic level prefixes, indexed by level number - 2 (phylum..species)
+_LEVEL_PREFIXES = ('p__', 'c__', 'o__', 'f__', 'g__', 's__')
+
+# Precompiled per-level regexes extracting the taxon name from the Taxa column
+_LEVEL_PATTERNS = tuple(re.compile(rb'(?:^|\|)' + re.escape(prefix.encode()) + rb'([^|\t\r\n]+)', re.M)
+                        for prefix in _LEVEL_PREFIXES)
+
 def convert_to_rpm(data_rows):
     """Convert read counts to reads per million (RPM)"""
     # Calculate total reads per sample (columns 1-4)
@@ -41,38 +53,16 @@ def extract_taxa_by_level(level_file, level_num):
     if not os.path.exists(level_file):
         return []
     
-    # Define taxonomic level patterns
-    level_patterns = {
-        2: 'p__',  # Phylum
-        3: 'c__',  # Class
-        4: 'o__',  # Order
-        5: 'f__',  # Family
-        6: 'g__',  # Genus
-        7: 's__'   # Species
-    }
-    
-    if level_num not in level_patterns:
+    if not 2 <= level_num <= 7:
         return []
     
-    pattern = level_patterns[level_num]
-    
-    # Read the TSV file manually
-    taxa_names = set()  # Use set to avoid duplicates
+    # Scan the whole file at once for '|'-separated fields starting with our pattern
+    taxa_regex = _LEVEL_PATTERNS[level_num - 2]
     
     try:
-        with open(level_file, 'r') as f:
-            reader = csv.reader(f, delimiter='\t')
-            next(reader)  # Skip header row
-            
-            for row in reader:
-                if len(row) > 0 and pattern in row[0]:
-                    # Split by '|' and find the part that starts with our pattern
-                    parts = row[0].split('|')
-                    for part in parts:
-                        if part.startswith(pattern):
-                            clean_name = part.replace(pattern, '')
-                            taxa_names.add(clean_name)
-                            break
+        with open(level_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b'\n') + 1  # Skip header row
+            taxa_names = {name.decode() for name in taxa_regex.findall(mm, header_end)}
     except Exception as e:
         print(f"Error reading file: {e}", file=sys.stderr)
         return []
@@ -81,25 +71,15 @@ def extract_taxa_by_level(level_file, level_num):
 
 def get_taxa_data(level_num, selected_taxon):
     """Get the RPM data for a specific taxon at a specific level"""
-    level_file = f"all_child-UC_kraken2_250616_level_{level_num}.tsv"
+    level_file = LEVEL_FILE_TEMPLATE.format(level_num)
     
     if not os.path.exists(level_file):
         return None
     
-    # Define taxonomic level patterns
-    level_patterns = {
-        2: 'p__',  # Phylum
-        3: 'c__',  # Class
-        4: 'o__',  # Order
-        5: 'f__',  # Family
-        6: 'g__',  # Genus
-        7: 's__'   # Species
-    }
-    
-    if level_num not in level_patterns:
+    if not 2 <= level_num <= 7:
         return None
     
-    pattern = level_patterns[level_num]
+    pattern = _LEVEL_PREFIXES[level_num - 2]
     
     # Read the TSV file and find the taxon
     try:
@@ -146,6 +126,28 @@ def get_taxa_data(level_num, selected_taxon):
     
     return None
 
+def get_taxa(level):
+    """Return the sorted taxa names at a level (the get_taxa command)"""
+    level = int(level)
+    return extract_taxa_by_level(LEVEL_FILE_TEMPLATE.format(level), level)
+
+def get_data(level, taxon):
+    """Return the RPM data for a taxon, or "Taxon not found" (the get_data command)"""
+    data = get_taxa_data(int(level), taxon)
+    return data if data else "Taxon not found"
+
+# Commands that return data, callable in-process by the web server
+COMMANDS = {
+    "get_taxa": get_taxa,
+    "get_data": get_data,
+}
+
+def dispatch(command, *args):
+    """Run a get_taxa/get_data command and return its JSON-serializable result"""
+    if command not in COMMANDS:
+        raise ValueError(f"Unknown command: {command}")
+    return COMMANDS[command](*args)
+
 def main():
     """Main function to handle command line arguments"""
     if len(sys.argv) < 2:
@@ -172,26 +174,16 @@ def main():
             print("Usage: python3 extract_taxa_simple.py get_taxa <level>")
             sys.exit(1)
         
-        level = int(sys.argv[2])
-        level_file = f"all_child-UC_kraken2_250616_level_{level}.tsv"
-        taxa = extract_taxa_by_level(level_file, level)
-        
         # Output as JSON for easy parsing
-        print(json.dumps(taxa))
+        print(json.dumps(dispatch(command, sys.argv[2])))
     
     elif command == "get_data":
         if len(sys.argv) < 4:
             print("Usage: python3 extract_taxa_simple.py get_data <level> <taxon>")
             sys.exit(1)
         
-        level = int(sys.argv[2])
-        taxon = sys.argv[3]
-        data = get_taxa_data(level, taxon)
-        
-        if data:
-            print(json.dumps(data))
-        else:
-            print("Taxon not found")
+        data = dispatch(command, sys.argv[2], sys.argv[3])
+        print(data if isinstance(data, str) else json.dumps(data))
     
     else:
         print(f"Unknown command: {command}")
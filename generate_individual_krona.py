@@ -4,10 +4,91 @@ Generate individual Krona plots for each sample from Kraken2 output.
 This script creates separate Krona HTML files for each sample showing their unique microbial composition.
 """
 
+import contextlib
+import io
+import logging
+import numpy as np
 import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 import subprocess
+import tempfile
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+
+log = logging.getLogger(__name__)
+
+def ensure_parquet(input_file):
+    """
+    Convert a Kraken2 TSV to Parquet once, so later runs can load columns on demand.
+    
+    Args:
+        input_file (str): Path to the Kraken2 output file
+    
+    Returns:
+        str: Path to the Parquet copy (rewritten whenever the TSV is newer)
+    """
+    parquet_file = input_file + '.parquet'
+    if (not os.path.exists(parquet_file)
+            or os.path.getmtime(parquet_file) < os.path.getmtime(input_file)):
+        df = pd.read_csv(input_file, sep='\t', index_col=0, engine='pyarrow')
+        df.to_parquet(parquet_file, compression='zstd')
+    return parquet_file
+
+def _process_sample(sample, srr_accession, payload, output_dir):
+    """
+    Write one sample's Krona input and run ktImportText on it.
+    
+    Args:
+        sample (str): Sample name
+        srr_accession (str): SRR accession used to name the output file
+        payload (bytes): Krona text input (taxonomy\tcount lines)
+        output_dir (str): Directory to save the Krona file
+    
+    Returns:
+        tuple: (status, message) where status is "ok", "error" or "missing_tool"
+    """
+    # Generate Krona HTML file with SRR-based naming
+    output_file = os.path.join(output_dir, f"{srr_accession}_krona.html")
+    dataset_name = f"temp_{sample}_krona"
+    temp_file = None
+    
+    try:
+        # Use ktImportText to create Krona HTML, streaming the data on stdin
+        cmd = [
+            'ktImportText',
+            '-o', output_file,
+            f"-,{dataset_name}"
+        ]
+        
+        log.debug("Running: %s", ' '.join(cmd))
+        result = subprocess.run(cmd, input=payload, capture_output=True)
+        
+        if result.returncode != 0:
+            # Fall back to a temporary file for ktImportText builds that cannot read stdin
+            fd, temp_file = tempfile.mkstemp(prefix=f"krona_{sample}_", suffix=".txt", dir=output_dir)
+            with os.fdopen(fd, 'wb', buffering=1 << 20) as f:
+                f.write(payload)
+            cmd[-1] = f"{temp_file},{dataset_name}"
+            log.debug("Retrying from file: %s", ' '.join(cmd))
+            result = subprocess.run(cmd, capture_output=True)
+        
+        if result.returncode == 0:
+            return "ok", output_file
+        else:
+            return "error", f"Error creating Krona file: {result.stderr.decode(errors='replace')}"
+            
+    except FileNotFoundError:
+        return "missing_tool", ("ktImportText not found. Please install Krona tools.\n"
+                                "     Install with: conda install -c bioconda krona")
+    except Exception as e:
+        return "error", f"Unexpected error: {e}"
+    finally:
+        # Clean up temporary file
+        if temp_file:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_file)
 
 def create_sample_krona_files(input_file, metadata_file, output_dir="krona_plots"):
     """
@@ -23,88 +104,72 @@ def create_sample_krona_files(input_file, metadata_file, output_dir="krona_plots
     os.makedirs(output_dir, exist_ok=True)
     
     # Read the metadata file to get sample name mappings
-    print(f"Reading metadata from {metadata_file}...")
-    metadata_df = pd.read_csv(metadata_file, sep='\t')
+    log.info("Reading metadata from %s", metadata_file)
+    metadata_df = pd.read_csv(metadata_file, sep='\t', usecols=['sample', 'srr'], engine='pyarrow')
     
-    # Create mapping from sample name to SRR accession
-    sample_to_srr = {}
-    for _, row in metadata_df.iterrows():
-        sample_name = row['sample']
-        srr_accession = row['srr'].strip()  # Remove any whitespace
-        sample_to_srr[sample_name] = srr_accession
+    # Create mapping from sample name to SRR accession (removing any whitespace)
+    sample_to_srr = dict(zip(metadata_df['sample'], metadata_df['srr'].fillna('').str.strip()))
     
-    print(f"Sample to SRR mapping: {sample_to_srr}")
+    log.debug("Sample to SRR mapping: %s", sample_to_srr)
     
     # Read the Kraken2 output file
-    print(f"Reading data from {input_file}...")
-    df = pd.read_csv(input_file, sep='\t', index_col=0)
+    log.info("Reading data from %s", input_file)
+    parquet_file = ensure_parquet(input_file)
+    schema = pq.read_schema(parquet_file)
+    index_columns = schema.pandas_metadata['index_columns']
     
     # Get sample names (columns)
-    samples = df.columns.tolist()
-    print(f"Found samples: {samples}")
+    samples = [name for name in schema.names if name not in index_columns]
+    log.info("Found samples: %s", samples)
     
     # Process each sample
+    mapped_samples = []
     for sample in samples:
-        print(f"\nProcessing sample: {sample}")
-        
         # Get the corresponding SRR accession
         if sample not in sample_to_srr:
-            print(f"  Warning: No SRR mapping found for sample {sample}")
+            log.warning("No SRR mapping found for sample %s", sample)
             continue
             
-        srr_accession = sample_to_srr[sample]
-        print(f"  Mapping to SRR: {srr_accession}")
-        
-        # Create sample-specific data
-        sample_data = df[[sample]].copy()
-        sample_data = sample_data[sample_data[sample] > 0]  # Remove zero counts
-        
-        if sample_data.empty:
-            print(f"  Warning: No data for sample {sample}")
+        mapped_samples.append(sample)
+    
+    # Stream the table once in row batches, appending each sample's non-zero
+    # rows to its Krona input (taxonomy\tcount), so memory is bounded by the batch size
+    payloads = {sample: io.BytesIO() for sample in mapped_samples}
+    parquet = pq.ParquetFile(parquet_file)
+    for batch in parquet.iter_batches(batch_size=200_000, columns=index_columns[:1] + mapped_samples):
+        # Replace | with tabs for hierarchical levels, once per distinct taxonomy string
+        encoded = pc.dictionary_encode(batch.column(0))
+        taxa = pc.take(pc.replace_substring(encoded.dictionary, pattern='|', replacement='\t'),
+                       encoded.indices).to_numpy(zero_copy_only=False)
+        for position, sample in enumerate(mapped_samples, 1):
+            # One pass over the raw column drives both the filter and the write
+            col = batch.column(position).to_numpy()
+            nonzero = np.flatnonzero(col > 0)
+            if nonzero.size:
+                np.savetxt(payloads[sample], np.column_stack([taxa[nonzero], col[nonzero].astype(str)]),
+                           fmt='%s', delimiter='\t', encoding='utf-8')
+    
+    jobs = []
+    for sample in mapped_samples:
+        payload = payloads[sample].getvalue()
+        if not payload:
+            log.warning("No data for sample %s", sample)
             continue
         
-        # Create temporary file for Krona input
-        temp_file = f"temp_{sample}_krona.txt"
-        
-        # Prepare data for Krona (taxonomy\tcount)
-        with open(temp_file, 'w') as f:
-            for taxon, row in sample_data.iterrows():
-                count = row[sample]
-                if count > 0:
-                    # Convert taxonomy string to Krona format
-                    # Replace | with tabs for hierarchical levels
-                    taxonomy = taxon.replace('|', '\t')
-                    f.write(f"{taxonomy}\t{count}\n")
-        
-        # Generate Krona HTML file with SRR-based naming
-        output_file = os.path.join(output_dir, f"{srr_accession}_krona.html")
-        
-        try:
-            # Use ktImportText to create Krona HTML
-            cmd = [
-                'ktImportText',
-                '-o', output_file,
-                temp_file
-            ]
-            
-            print(f"  Running: {' '.join(cmd)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                print(f"  ✅ Successfully created: {output_file}")
-            else:
-                print(f"  ❌ Error creating Krona file: {result.stderr}")
-                
-        except FileNotFoundError:
-            print(f"  ❌ Error: ktImportText not found. Please install Krona tools.")
-            print(f"     Install with: conda install -c bioconda krona")
-            break
-        except Exception as e:
-            print(f"  ❌ Unexpected error: {e}")
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        jobs.append((sample, sample_to_srr[sample], payload, output_dir))
+    
+    # Samples are independent, so run ktImportText for all of them in parallel
+    if jobs:
+        log.info("Generating Krona files for %d samples", len(jobs))
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for job, (status, message) in zip(jobs, executor.map(_process_sample, *zip(*jobs))):
+                sample, srr_accession = job[:2]
+                if status == "ok":
+                    log.info("sample=%s srr=%s -> %s", sample, srr_accession, message)
+                    continue
+                print(f"❌ sample={sample} srr={srr_accession}: {message}")
+                if status == "missing_tool":
+                    break
     
     print(f"\n🎉 Krona generation complete! Files saved in '{output_dir}' directory.")
     return output_dir
@@ -112,6 +177,10 @@ def create_sample_krona_files(input_file, metadata_file, output_dir="krona_plots
 def main():
     """Main function to run the script."""
     
+    # Per-sample progress is logged at INFO; set LOGLEVEL=INFO (or DEBUG) to see it
+    logging.basicConfig(level=os.environ.get('LOGLEVEL', 'WARNING').upper(),
+                        format='%(levelname)s: %(message)s')
+    
     # Check if input file exists
     input_file = "all_child-UC_kraken2_250616.tsv"
     metadata_file = "metadata.tsv"
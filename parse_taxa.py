@@ -1,29 +1,57 @@
+import csv
+import numpy as np
 import pandas as pd
 import sys
 
+from generate_individual_krona import ensure_parquet
+
 # Load the data
 input_file = sys.argv[1]
-df = pd.read_csv(input_file, sep='\t', index_col='ID')
+df = pd.read_parquet(ensure_parquet(input_file))
 
 # Function to extract and save subtables for each taxonomic level
 def save_subtables(df, base_filepath):
-    taxa_split = df.index.str.split('|')
-    max_depth = max(len(taxa) for taxa in taxa_split)
+    parts = df.index.to_series().str.split('|', expand=True)
+    present = parts.notna().to_numpy()
+    parts = parts.fillna('').to_numpy(dtype=object)
+    max_depth = parts.shape[1]
+    values = df.to_numpy()
+    
+    present[:, 0] &= parts[:, 0] != ''
+    
+    # Factorize each rank once; a taxon at a given depth is then identified by
+    # its tuple of integer codes, which is far cheaper to hash than the joined string
+    factorized = [pd.factorize(parts[:, rank]) for rank in range(max_depth)]
+    codes = np.stack([rank_codes for rank_codes, _ in factorized], axis=1)
+    rank_names = [np.asarray(uniques, dtype=object) for _, uniques in factorized]
     
+    # Select the first row of each taxon at every depth, skipping rows whose lineage is shorter
+    kept = []
+    taxa_levels = []
     for depth in range(max_depth):
-        taxa_level = ['|'.join(taxa[:depth + 1]) if len(taxa) > depth else '' for taxa in taxa_split]
-        sub_df = df.copy()
-        sub_df.index = taxa_level
-        sub_df = sub_df[~sub_df.index.duplicated(keep='first')]  # Remove duplicates
-        sub_df.reset_index(inplace=True)
-        sub_df.rename(columns={'index': 'Taxa'}, inplace=True)
-        
-        # Filter out rows where 'Taxa' is an empty string
-        sub_df = sub_df[sub_df['Taxa'] != '']
+        rows = np.flatnonzero(present[:, depth])
+        key = np.ascontiguousarray(codes[rows, :depth + 1]).view([('', codes.dtype)] * (depth + 1)).ravel()
+        _, first = np.unique(key, return_index=True)
+        keep = np.sort(rows[first])
         
+        # Only rebuild taxonomy strings from the codes for the rows that are written
+        taxa_level = rank_names[0][codes[keep, 0]]
+        for rank in range(1, depth + 1):
+            taxa_level = taxa_level + '|' + rank_names[rank][codes[keep, rank]]
+        kept.append(keep)
+        taxa_levels.append(taxa_level)
+    
+    # Stack every depth into one long table, then split it back out by depth for writing
+    keep = np.concatenate(kept)
+    long_df = pd.DataFrame(values[keep], columns=df.columns).astype(df.dtypes.to_dict())
+    long_df.insert(0, 'Taxa', np.concatenate(taxa_levels))
+    depth_labels = np.repeat(np.arange(max_depth), [len(k) for k in kept])
+    
+    for depth, idx in pd.Series(depth_labels).groupby(depth_labels).indices.items():
         taxonomic_rank = f'level_{depth + 1}'
         output_filename = f'{base_filepath}_{taxonomic_rank}.tsv'
-        sub_df.to_csv(output_filename, sep='\t', index=False)
+        with open(output_filename, 'w', buffering=1 << 20, newline='') as fh:
+            long_df.iloc[idx].to_csv(fh, sep='\t', index=False, quoting=csv.QUOTE_NONE, lineterminator='\n')
         print(f'Saved: {output_filename}')
 
 # Extract the base filepath without extension to use in output filenames
@@ -4,9 +4,12 @@ Setup script for AI Microbiome Plot Explainer
 Helps users get started with the system
 """
 
+import json
+import shutil
 import subprocess
 import sys
-import os
+import urllib.error
+import urllib.request
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -20,7 +23,9 @@ def install_requirements():
     """Install required Python packages"""
     print("\n📦 Installing Python dependencies...")
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
+        subprocess.check_call([sys.executable, "-m", "pip", "install",
+                               "--prefer-binary", "--disable-pip-version-check",
+                               "-r", "requirements.txt"])
         print("✅ Dependencies installed successfully")
         return True
     except subprocess.CalledProcessError as e:
@@ -28,20 +33,28 @@ def install_requirements():
         return False
 
 def check_ollama():
-    """Check if Ollama is available"""
+    """
+    Check if Ollama is installed, whether its daemon is running and whether the AI
+    model is available. Looks the CLI up on PATH and queries the local API once
+    instead of spawning the ollama CLI.
+    
+    Returns:
+        tuple: (installed, daemon_running, model_available)
+    """
     print("\n🔍 Checking for Ollama...")
     try:
-        # Try to run ollama --version
-        result = subprocess.run(["ollama", "--version"], capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"✅ Ollama found: {result.stdout.strip()}")
-            return True
-        else:
-            print("❌ Ollama command failed")
-            return False
-    except FileNotFoundError:
-        print("❌ Ollama not found in PATH")
-        return False
+        with urllib.request.urlopen("http://localhost:11434/api/tags", timeout=1) as response:
+            tags = json.load(response)
+    except (urllib.error.URLError, OSError, ValueError):
+        if shutil.which("ollama") is None:
+            print("❌ Ollama is not installed")
+            return False, False, False
+        print("❌ Ollama is installed but not running at http://localhost:11434")
+        return True, False, False
+    
+    models = [model.get("name", "") for model in tags.get("models", [])]
+    print(f"✅ Ollama running with {len(models)} model(s)")
+    return True, True, "gpt-oss:20b" in models
 
 def install_ollama():
     """Provide instructions for installing Ollama"""
@@ -94,23 +107,23 @@ def main():
         return
     
     # Check Ollama
-    if not check_ollama():
+    ollama_installed, ollama_running, model_available = check_ollama()
+    if not ollama_installed:
         install_ollama()
         return
+    if not ollama_running:
+        print("Start the Ollama daemon with: ollama serve")
+        print("Then re-run this setup script.")
+        return
     
     # Try to pull the model
     print("\n🤖 Checking if AI model is available...")
-    try:
-        result = subprocess.run(["ollama", "list"], capture_output=True, text=True)
-        if "gpt-oss:20b" in result.stdout:
-            print("✅ AI model already available")
-        else:
-            print("📥 AI model not found, downloading...")
-            if not pull_model():
-                return
-    except Exception as e:
-        print(f"❌ Error checking models: {e}")
-        return
+    if model_available:
+        print("✅ AI model already available")
+    else:
+        print("📥 AI model not found, downloading...")
+        if not pull_model():
+            return
     
     print("\n🎉 Setup complete!")
     print("\nTo use the AI explainer:")
@@ -5,72 +5,91 @@ This allows the HTML page to fetch taxa data and create visualizations.
 """
 
 import http.server
-import socketserver
 import urllib.parse
-import subprocess
+import base64
+import contextlib
+import functools
+import gzip
+import hashlib
+import importlib
 import json
+import mmap
 import os
+import re
+import socket
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
 from pathlib import Path
 
-class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        # Parse the URL
-        parsed_url = urllib.parse.urlparse(self.path)
-        path = parsed_url.path
-        query = urllib.parse.parse_qs(parsed_url.query)
-        
-        # Handle API calls to extract_taxa.py
-        if path == '/cgi-bin/extract_taxa.py':
-            self.handle_taxa_request(query)
-        elif path == '/cgi-bin/taxa_comparison.py':
-            self.handle_taxa_comparison_request(query)
-        elif path.endswith('.md'):
-            # Handle markdown files with proper content type
-            self.serve_markdown_file(path)
-        else:
-            # Serve static files normally
-            super().do_GET()
+import markdown
+
+try:
+    import orjson
+    _json_loads = orjson.loads
     
-    def do_POST(self):
-        """Handle POST requests for AI analysis"""
-        parsed_url = urllib.parse.urlparse(self.path)
-        path = parsed_url.path
-        
-        if path == '/cgi-bin/ai_analyze.py':
-            self.handle_ai_analysis_request()
-        elif path == '/cgi-bin/ai_summary.py':
-            self.handle_ai_summary_request()
-        else:
-            self.send_error(405, "Method not allowed")
+    def _json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
     
-    def serve_markdown_file(self, path):
-        """Serve markdown files as rendered HTML"""
-        try:
-            # Remove leading slash and get file path
-            file_path = path.lstrip('/')
-            
-            # Check if file exists
-            if not os.path.exists(file_path):
-                self.send_error(404, "File not found")
-                return
-            
-            # Read the markdown content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                markdown_content = f.read()
-            
-            # Convert markdown to HTML
-            import markdown
-            html_content = markdown.markdown(markdown_content, extensions=['tables', 'fenced_code', 'codehilite'])
-            
-            # Create a complete HTML document with proper styling
-            full_html = f"""<!DOCTYPE html>
+    def _json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode()
+
+# Error bodies for the fixed messages are encoded once; only dynamic ones hit the encoder
+_ERR_CACHE = {
+    message: _json_dumps({'error': message})
+    for message in (
+        'Invalid command',
+        'Missing level parameter',
+        'Missing level or taxon parameter',
+        'Missing command or level parameter',
+        'Invalid format. Use "tsv" or "excel"',
+        'No data available for this taxonomic level',
+        'No data received',
+        'Expected a JSON array of queries',
+    )
+}
+
+try:
+    from streaming_form_data import StreamingFormDataParser
+    from streaming_form_data.targets import ValueTarget
+    
+    class _FormField(ValueTarget):
+        """ValueTarget that also records whether its field appeared in the body"""
+        received = False
+        
+        def on_start(self):
+            self.received = True
+except ImportError:
+    StreamingFormDataParser = None
+
+# Make the analysis modules (and the PDF builder in cgi-bin) importable once, at startup
+_BASE_DIR = Path(__file__).resolve().parent
+_BASE = str(_BASE_DIR)
+if _BASE not in sys.path:
+    sys.path.insert(0, _BASE)
+if str(_BASE_DIR / 'cgi-bin') not in sys.path:
+    sys.path.append(str(_BASE_DIR / 'cgi-bin'))
+
+import ai_realtime_analyzer
+import extract_taxa_simple
+
+# Static parts of the markdown page, encoded once; only the file name and body vary per request
+_MD_PAGE_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{os.path.basename(file_path)} - Documentation</title>
+    <title>""".encode('utf-8')
+_MD_PAGE_TITLE_END = """ - Documentation</title>
     <style>
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
             line-height: 1.6;
             max-width: 1200px;
@@ -78,150 +97,659 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
             padding: 20px;
             background-color: #f8f9fa;
             color: #333;
-        }}
-        .container {{
+        }
+        .container {
             background: white;
             padding: 40px;
             border-radius: 12px;
             box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }}
-        h1, h2, h3, h4, h5, h6 {{
+        }
+        h1, h2, h3, h4, h5, h6 {
             color: #2c3e50;
             margin-top: 30px;
             margin-bottom: 15px;
-        }}
-        h1 {{
+        }
+        h1 {
             border-bottom: 3px solid #3498db;
             padding-bottom: 10px;
-        }}
-        h2 {{
+        }
+        h2 {
             border-bottom: 2px solid #ecf0f1;
             padding-bottom: 8px;
-        }}
-        code {{
+        }
+        code {
             background-color: #f8f9fa;
             padding: 2px 6px;
             border-radius: 4px;
             font-family: 'SF Mono', Monaco, 'Cascadia Code', 'Roboto Mono', Consolas, 'Courier New', monospace;
             font-size: 0.9em;
-        }}
-        pre {{
+        }
+        pre {
             background-color: #f8f9fa;
             padding: 15px;
             border-radius: 8px;
             overflow-x: auto;
             border-left: 4px solid #3498db;
-        }}
-        pre code {{
+        }
+        pre code {
             background: none;
             padding: 0;
-        }}
-        blockquote {{
+        }
+        blockquote {
             border-left: 4px solid #3498db;
             margin: 20px 0;
             padding: 10px 20px;
             background-color: #ecf0f1;
             font-style: italic;
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             width: 100%;
             margin: 20px 0;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #ddd;
             padding: 12px;
             text-align: left;
-        }}
-        th {{
+        }
+        th {
             background-color: #3498db;
             color: white;
-        }}
-        tr:nth-child(even) {{
+        }
+        tr:nth-child(even) {
             background-color: #f8f9fa;
-        }}
-        ul, ol {{
+        }
+        ul, ol {
             padding-left: 20px;
-        }}
-        li {{
+        }
+        li {
             margin: 8px 0;
-        }}
-        a {{
+        }
+        a {
             color: #3498db;
             text-decoration: none;
-        }}
-        a:hover {{
+        }
+        a:hover {
             text-decoration: underline;
-        }}
-        .header {{
+        }
+        .header {
             background: linear-gradient(135deg, #3498db 0%, #2980b9 100%);
             color: white;
             padding: 20px;
             margin: -40px -40px 30px -40px;
             border-radius: 12px 12px 0 0;
-        }}
-        .header h1 {{
+        }
+        .header h1 {
             margin: 0;
             border: none;
             padding: 0;
-        }}
+        }
 
     </style>
 </head>
 <body>
     <div class="container">
         <div class="header">
-            <h1>📚 {os.path.basename(file_path)}</h1>
+            <h1>📚 """.encode('utf-8')
+_MD_PAGE_BODY_START = """</h1>
         </div>
 
-        {html_content}
+        """.encode('utf-8')
+_MD_PAGE_TAIL = """
     </div>
 </body>
-</html>"""
+</html>""".encode('utf-8')
+
+# Markdown renderers are built once per worker thread (Markdown instances are not
+# thread-safe) and reset between documents
+_MD_EXTENSIONS = ['tables', 'fenced_code', 'codehilite']
+_md_local = threading.local()
+
+def render_markdown(markdown_content):
+    """Convert markdown to HTML with this thread's renderer"""
+    renderer = getattr(_md_local, 'renderer', None)
+    if renderer is None:
+        renderer = _md_local.renderer = markdown.Markdown(extensions=_MD_EXTENSIONS)
+    return renderer.reset().convert(markdown_content)
+
+# One multipart part (the text between two boundary delimiters): its header block and its value
+_MULTIPART_RE = re.compile(rb'[ \t]*\r\n((?:[^\r\n]+\r\n)*)\r\n(.*)\Z', re.DOTALL)
+_PART_NAME_RE = re.compile(rb'^Content-Disposition:[^\r\n]*?\bname="([^"]*)"', re.IGNORECASE | re.MULTILINE)
+
+# Form fields that carry JSON; they are parsed straight from the raw part bytes
+_JSON_FIELDS = frozenset(('payload', 'sample_data', 'sample_names', 'rpm_values'))
+
+def _form_value(name, raw):
+    """Decode one form field: JSON fields become Python objects, others text"""
+    if name in _JSON_FIELDS:
+        try:
+            return _json_loads(raw)
+        except ValueError:
+            pass  # left as text; the analyzer reports the parse error
+    return raw.decode('utf-8')
+
+def _form_json(form_data, name, default):
+    """Return a JSON form field as a Python object, parsing it if it is still text"""
+    value = form_data.get(name, default)
+    return _json_loads(value) if isinstance(value, str) else value
+
+# Bound once; urlsplit skips the ;params parsing urlparse does, which no route uses
+_urlsplit = urllib.parse.urlsplit
+_parse_qs = urllib.parse.parse_qs
+
+# Level numbers used by the web page mapped to taxonomic level names
+_LEVEL_MAPPING = {
+    "2": "phylum", "3": "class", "4": "order",
+    "5": "family", "6": "genus", "7": "species"
+}
+
+# Form fields accepted by the AI analysis and summary endpoints
+_FORM_FIELDS = ('plot_type', 'taxon_name', 'taxonomic_level', 'payload', 'sample_data',
+                'sample_names', 'rpm_values', 'report_type')
+
+# Set DEV_RELOAD=1 to re-import the analysis modules on every request while developing them
+DEV_RELOAD = os.environ.get('DEV_RELOAD') == '1'
+
+_ANALYZER = None
+_ANALYZER_LOCK = threading.Lock()
+
+def get_analyzer():
+    """Return the shared RealTimeMicrobiomeAnalyzer, creating it on first use"""
+    global _ANALYZER
+    with _ANALYZER_LOCK:
+        if _ANALYZER is None or DEV_RELOAD:
+            if DEV_RELOAD:
+                importlib.reload(ai_realtime_analyzer)
+            _ANALYZER = ai_realtime_analyzer.RealTimeMicrobiomeAnalyzer()
+        return _ANALYZER
+
+# Generated taxa comparison downloads keyed by (format, level, input mtimes), bounded as an LRU;
+# TSV tables are held as bytes, Excel workbooks as files under .cache/ (which survive restarts
+# and are deleted when their entry is evicted). Failed generations are never cached
+_COMPARISON_CACHE = OrderedDict()
+_COMPARISON_CACHE_SIZE = 32
+_COMPARISON_CACHE_LOCK = threading.Lock()
+_CACHE_DIR = '.cache'
+
+# generate_taxa_comparison_tsv reports failures in-band with these messages
+_TSV_FAILURES = ('Error generating TSV', 'No data available')
+
+# Largest request body read and discarded before rejecting an unsupported POST
+_MAX_DRAIN = 64 * 1024
+
+def _open_comparison(entry):
+    """Return a cached comparison entry with an Excel workbook path opened for reading"""
+    etag, content = entry
+    return (etag, open(content, 'rb')) if isinstance(content, str) else entry
+
+def get_taxa_comparison(taxonomic_level, format_type):
+    """
+    Return (etag, content) for a taxa comparison table: TSV bytes, or the Excel file opened
+    for reading (the caller closes it); a failed generation comes back uncached with no ETag
+    (Excel as workbook bytes)
+    """
+    analyzer = get_analyzer()
+    key = (format_type, taxonomic_level, analyzer.source_fingerprint())
+    with _COMPARISON_CACHE_LOCK:
+        entry = _COMPARISON_CACHE.get(key)
+        if entry is not None:
+            # Open the workbook under the lock so a concurrent eviction can only unlink it
+            # after this request already holds a handle
+            try:
+                opened = _open_comparison(entry)
+            except FileNotFoundError:
+                del _COMPARISON_CACHE[key]
+            else:
+                _COMPARISON_CACHE.move_to_end(key)
+                return opened
+    
+    digest = hashlib.blake2b(repr(key).encode('utf-8'), digest_size=16).hexdigest()
+    if format_type == 'tsv':
+        tsv_content = analyzer.generate_taxa_comparison_tsv(taxonomic_level)
+        content = tsv_content.encode('utf-8') if tsv_content else b''
+        ok = bool(tsv_content) and not tsv_content.startswith(_TSV_FAILURES)
+        result = content
+    else:
+        content = os.path.join(_CACHE_DIR, f"taxa_{taxonomic_level}_{digest}.xlsx")
+        ok = True
+        try:
+            result = open(content, 'rb')
+        except FileNotFoundError:
+            # Save the workbook straight to disk rather than building it in memory
+            os.makedirs(_CACHE_DIR, exist_ok=True)
+            temp_file = f"{content}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_file, 'wb') as out:
+                    ok = analyzer.write_taxa_comparison_excel(taxonomic_level, out)
+                if ok:
+                    os.replace(temp_file, content)
+                    result = open(content, 'rb')
+                else:
+                    # Hand back the error workbook once instead of persisting it
+                    with open(temp_file, 'rb') as f:
+                        result = f.read()
+            finally:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(temp_file)
+    
+    if not ok:
+        return None, result
+    
+    etag = f'"{digest}"'
+    evicted = None
+    with _COMPARISON_CACHE_LOCK:
+        _COMPARISON_CACHE[key] = (etag, content)
+        if len(_COMPARISON_CACHE) > _COMPARISON_CACHE_SIZE:
+            _, evicted = _COMPARISON_CACHE.popitem(last=False)
+    if evicted is not None and isinstance(evicted[1], str):
+        # Requests still streaming the evicted workbook keep their open handles
+        with contextlib.suppress(OSError):
+            os.remove(evicted[1])
+    return etag, result
+
+# Encoded bodies of successful AI analysis/summary responses keyed by a hash of
+# (endpoint, form fields, input mtimes)
+_AI_CACHE = OrderedDict()
+_AI_CACHE_SIZE = 128
+_AI_CACHE_LOCK = threading.Lock()
+
+def cached_ai_result(kind, form_data, compute, force=False):
+    """
+    Return compute(form_data) as encoded JSON bytes, reusing an earlier successful
+    result unless force is set
+    """
+    fingerprint = get_analyzer().source_fingerprint()
+    key = hashlib.blake2b(json.dumps([kind, form_data, fingerprint], sort_keys=True).encode('utf-8'),
+                          digest_size=16).digest()
+    if not force:
+        with _AI_CACHE_LOCK:
+            body = _AI_CACHE.get(key)
+            if body is not None:
+                _AI_CACHE.move_to_end(key)
+                return body
+    
+    result = compute(form_data)
+    body = _json_dumps(result)
+    # Fallback text (Ollama down, PDF failed) is served but not kept, so the next request retries
+    if result.get('success') and not result.get('fallback'):
+        with _AI_CACHE_LOCK:
+            _AI_CACHE[key] = body
+            if len(_AI_CACHE) > _AI_CACHE_SIZE:
+                _AI_CACHE.popitem(last=False)
+    return body
+
+# Background pool for slow LLM + PDF work; clients submit with ?async=1 and poll /cgi-bin/ai_job
+_AI_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='ai-job')
+_JOBS = {}  # job id -> (submitted at, Future)
+_JOBS_LOCK = threading.Lock()
+_JOB_TTL = 600.0
+
+def submit_ai_job(fn, *args):
+    """Run fn(*args) on the AI pool and return a job id to poll for its result"""
+    now = time.monotonic()
+    with _JOBS_LOCK:
+        # Forget finished jobs nobody collected
+        for stale in [job_id for job_id, (submitted, future) in _JOBS.items()
+                      if future.done() and now - submitted > _JOB_TTL]:
+            del _JOBS[stale]
+        
+        job_id = uuid.uuid4().hex
+        _JOBS[job_id] = (now, _AI_POOL.submit(fn, *args))
+    return job_id
+
+# JSON bodies above this size are gzipped (at level 1) for clients that accept it
+_GZIP_MIN_SIZE = 1024
+
+def _gzip_etag(etag):
+    """ETag of the gzip representation of a body validated by etag"""
+    return etag[:-1] + '-gzip"'
+
+@functools.lru_cache(maxsize=512)
+def _cached_extract(command, args, data_mtime):
+    """
+    Run an extract_taxa_simple command in-process and return (etag, JSON body bytes,
+    gzipped body or None); data_mtime ties the cache entry to the level file version
+    """
+    result = extract_taxa_simple.dispatch(command, *args)
+    body = _json_dumps({'result': result} if isinstance(result, str) else result)
+    gzipped = gzip.compress(body, 1, mtime=0) if len(body) > _GZIP_MIN_SIZE else None
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"', body, gzipped
+
+class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # Keep connections open between requests; every response sends a Content-Length.
+    # Idle keep-alive connections are dropped after a few seconds so they do not pin pool workers
+    protocol_version = "HTTP/1.1"
+    timeout = 5
+    
+    # Buffer the response so the header block and small bodies leave in one send();
+    # the server flushes it after every request
+    wbufsize = 64 * 1024
+    
+    # Responses are small request/response pairs, so send them without waiting on Nagle
+    disable_nagle_algorithm = True
+    
+    # Rendered markdown pages (as byte chunks) keyed by (content hash, file name), bounded as an LRU
+    _MD_CACHE = OrderedDict()
+    _MD_CACHE_SIZE = 256
+    _MD_CACHE_LOCK = threading.Lock()
+    
+    # Markdown file path -> (size, mtime_ns, _MD_CACHE key), so unchanged files are only stat'ed
+    _MD_STAT_CACHE = {}
+    
+    # Static assets: filesystem path -> (mtime_ns, size, checked_at, raw, gzipped, etag, content_type);
+    # a cached asset is re-stat'ed at most every _STATIC_RECHECK seconds. Bounded as an LRU
+    # by the bytes held (raw plus gzipped copies)
+    _STATIC = OrderedDict()
+    _STATIC_LOCK = threading.Lock()
+    _STATIC_MAX_SIZE = 8 * 1024 * 1024
+    _STATIC_CACHE_BYTES = 64 * 1024 * 1024
+    _STATIC_BYTES = 0
+    _STATIC_RECHECK = 2.0
+    
+    def __init__(self, *args, **kwargs):
+        # Serve from the script directory resolved at import, instead of the stock
+        # handler's os.getcwd() call for every connection
+        super().__init__(*args, directory=_BASE, **kwargs)
+    
+    def do_GET(self):
+        # Parse the URL; static files usually carry no query string
+        parsed_url = _urlsplit(self.path)
+        path = parsed_url.path
+        query = _parse_qs(parsed_url.query) if parsed_url.query else {}
+        
+        # Handle API calls to extract_taxa.py
+        if path == '/cgi-bin/extract_taxa.py':
+            self.handle_taxa_request(query)
+        elif path == '/cgi-bin/taxa_comparison.py':
+            self.handle_taxa_comparison_request(query)
+        elif path == '/cgi-bin/ai_job':
+            self.handle_ai_job_request(query)
+        elif path.endswith('.md'):
+            # Handle markdown files with proper content type
+            self.serve_markdown_file(path)
+        else:
+            # Serve static files from the in-memory asset cache
+            self.serve_static_file(path)
+    
+    def do_POST(self):
+        """Handle POST requests for AI analysis"""
+        parsed_url = _urlsplit(self.path)
+        path = parsed_url.path
+        query = _parse_qs(parsed_url.query) if parsed_url.query else {}
+        
+        # ?force=1 skips the memoized result and regenerates it
+        force = query.get('force', ['0'])[0] == '1'
+        
+        if path == '/cgi-bin/ai_analyze.py':
+            self.handle_ai_analysis_request(force)
+        elif path == '/cgi-bin/extract_taxa_batch.py':
+            self.handle_batch_taxa_request()
+        elif path == '/cgi-bin/ai_summary.py':
+            # ?async=1 queues the summary as a background job instead of waiting for it
+            self.handle_ai_summary_request(force, query.get('async', ['0'])[0] == '1')
+        else:
+            # Drain a small unread body so closing the socket does not reset the 405 away;
+            # a missing, malformed or oversized length just drops the connection
+            try:
+                length = int(self.headers.get('Content-Length', ''))
+            except ValueError:
+                length = -1
+            if 0 <= length <= _MAX_DRAIN and 'Transfer-Encoding' not in self.headers:
+                self.rfile.read(length)
+            else:
+                self.close_connection = True
+            self.send_error(405, "Method not allowed")
+    
+    @staticmethod
+    def _is_compressible(content_type):
+        return (content_type.startswith('text/')
+                or content_type.split(';')[0] in ('application/javascript', 'application/json',
+                                                  'application/xml', 'image/svg+xml'))
+    
+    def _load_static(self, file_path):
+        """Return the cache entry for a static file, (re)reading it when it changed on disk"""
+        now = time.monotonic()
+        with self._STATIC_LOCK:
+            entry = self._STATIC.get(file_path)
+            if entry is not None:
+                self._STATIC.move_to_end(file_path)
+        if entry is not None and now - entry[2] < self._STATIC_RECHECK:
+            return entry
+        
+        stat = os.stat(file_path)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            entry = (entry[0], entry[1], now) + entry[3:]
+        elif stat.st_size > self._STATIC_MAX_SIZE:
+            return None
+        else:
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            content_type = self.guess_type(file_path)
+            gzipped = gzip.compress(raw, 6, mtime=0) if self._is_compressible(content_type) else None
+            etag = '"' + hashlib.blake2b(raw, digest_size=8).hexdigest() + '"'
+            entry = (stat.st_mtime_ns, stat.st_size, now, raw, gzipped, etag, content_type)
+        
+        self._store_static(file_path, entry)
+        return entry
+    
+    def _store_static(self, file_path, entry):
+        """Insert a static cache entry, evicting least recently used assets over the byte budget"""
+        cls = TaxaRequestHandler
+        with cls._STATIC_LOCK:
+            old = cls._STATIC.pop(file_path, None)
+            if old is not None:
+                cls._STATIC_BYTES -= len(old[3]) + len(old[4] or b'')
+            cls._STATIC[file_path] = entry
+            cls._STATIC_BYTES += len(entry[3]) + len(entry[4] or b'')
+            while cls._STATIC_BYTES > cls._STATIC_CACHE_BYTES and len(cls._STATIC) > 1:
+                _, evicted = cls._STATIC.popitem(last=False)
+                cls._STATIC_BYTES -= len(evicted[3]) + len(evicted[4] or b'')
+    
+    def serve_static_file(self, path):
+        """Serve a static file with a strong ETag and gzip when the client accepts it"""
+        file_path = self.translate_path(path)
+        if not os.path.isfile(file_path) or path.endswith('/'):
+            # Directories, redirects and missing files keep the stock behaviour
+            super().do_GET()
+            return
+        
+        entry = self._load_static(file_path)
+        if entry is None:
+            self._serve_large_static(file_path)
+            return
+        
+        _, _, _, raw, gzipped, etag, content_type = entry
+        body = raw
+        use_gzip = gzipped is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if use_gzip:
+            # The encoded representation gets its own strong validator
+            body = gzipped
+            etag = _gzip_etag(etag)
+        
+        if self._etag_matches(etag):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            if gzipped is not None:
+                self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if gzipped is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+            if use_gzip:
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _serve_large_static(self, file_path):
+        """
+        Serve a file too large for the asset cache (e.g. a big Krona HTML) with sendfile,
+        validated by a weak ETag built from its mtime and size instead of a content hash
+        """
+        with open(file_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            etag = 'W/"%x-%x"' % (stat.st_mtime_ns, stat.st_size)
+            if self._etag_matches(etag):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            
+            self.send_response(200)
+            self.send_header('Content-Type', self.guess_type(file_path))
+            self.send_header('Content-Length', str(stat.st_size))
+            self.send_header('Last-Modified', self.date_time_string(stat.st_mtime))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.flush()
+            self.connection.sendfile(f)
+    
+    def _etag_matches(self, etag):
+        """True when If-None-Match lists this ETag (weak comparison) or is *"""
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        opaque = etag[2:] if etag.startswith('W/') else etag
+        return any((tag[2:] if tag.startswith('W/') else tag) == opaque
+                   for tag in (t.strip() for t in header.split(',')))
+    
+    def serve_markdown_file(self, path):
+        """Serve markdown files as rendered HTML"""
+        try:
+            # Remove leading slash and get file path
+            file_path = path.lstrip('/')
+            
+            # Check if file exists
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                self.send_error(404, "File not found")
+                return
+            
+            # An unchanged file maps straight to its rendered page without being read
+            page_chunks = None
+            with self._MD_CACHE_LOCK:
+                stat_entry = self._MD_STAT_CACHE.get(file_path)
+                if stat_entry is not None and stat_entry[:2] == (st.st_size, st.st_mtime_ns):
+                    page_chunks = self._MD_CACHE.get(stat_entry[2])
+                    if page_chunks is not None:
+                        self._MD_CACHE.move_to_end(stat_entry[2])
+            
+            if page_chunks is None:
+                page_chunks = self._load_markdown_page(file_path, st)
             
             # Send response
             self.send_response(200)
             self.send_header('Content-Type', 'text/html; charset=utf-8')
-            self.send_header('Content-Length', str(len(full_html.encode('utf-8'))))
+            self.send_header('Content-Length', str(sum(map(len, page_chunks))))
             self.end_headers()
             
             # Write HTML content
-            self.wfile.write(full_html.encode('utf-8'))
+            for chunk in page_chunks:
+                self.wfile.write(chunk)
             
         except Exception as e:
             print(f"Error serving markdown file {path}: {e}")
             self.send_error(500, f"Internal server error: {e}")
     
-    def handle_ai_analysis_request(self):
+    def _load_markdown_page(self, file_path, st):
+        """Read a markdown file and return its page chunks, rendering only unseen content"""
+        # Map the source instead of copying it; it is only decoded when it has to be rendered
+        with open(file_path, 'rb') as f:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b''
+            try:
+                # Reuse the rendered page when this exact markdown has been served before
+                cache_key = (hashlib.blake2b(source, digest_size=16).digest(), os.path.basename(file_path))
+                with self._MD_CACHE_LOCK:
+                    page_chunks = self._MD_CACHE.get(cache_key)
+                    if page_chunks is not None:
+                        self._MD_CACHE.move_to_end(cache_key)
+                
+                if page_chunks is None:
+                    basename = os.path.basename(file_path).encode('utf-8')
+                    page_chunks = (_MD_PAGE_HEAD, basename, _MD_PAGE_TITLE_END, basename,
+                                   _MD_PAGE_BODY_START, render_markdown(source[:].decode('utf-8')).encode('utf-8'),
+                                   _MD_PAGE_TAIL)
+            finally:
+                if st.st_size:
+                    source.close()
+        
+        with self._MD_CACHE_LOCK:
+            self._MD_CACHE[cache_key] = page_chunks
+            self._MD_CACHE.move_to_end(cache_key)
+            if len(self._MD_CACHE) > self._MD_CACHE_SIZE:
+                self._MD_CACHE.popitem(last=False)
+            self._MD_STAT_CACHE[file_path] = (st.st_size, st.st_mtime_ns, cache_key)
+        return page_chunks
+    
+    def _parse_multipart(self, content_length):
+        """Parse a multipart/form-data POST body into {field name: text or parsed JSON value}"""
+        content_type = self.headers.get('Content-Type', '')
+        if 'multipart/form-data' not in content_type:
+            self.rfile.read(content_length)
+            return {}
+        
+        form_data = {}
+        if StreamingFormDataParser is not None:
+            # Feed the body to the streaming parser in 32 KB chunks
+            parser = StreamingFormDataParser(headers={'Content-Type': content_type})
+            fields = {name: _FormField() for name in _FORM_FIELDS}
+            for name, target in fields.items():
+                parser.register(name, target)
+            
+            read = self.rfile.read
+            feed = parser.data_received
+            remaining = content_length
+            while remaining > 0:
+                chunk = read(min(remaining, 32 * 1024))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                feed(chunk)
+            
+            for name, target in fields.items():
+                # Skip file uploads, as the text-field parser always did
+                if target.received and target.multipart_content_type is None:
+                    form_data[name] = _form_value(name, target.value)
+        else:
+            # Split the raw body on the exact boundary delimiter, so values may contain
+            # any bytes (including CRLF); parts carrying their own Content-Type are file uploads
+            header = Message()
+            header['Content-Type'] = content_type
+            delimiter = b'\r\n--' + header.get_param('boundary', '').encode('latin-1')
+            body = self.rfile.read(content_length)
+            for part in (b'\r\n' + body).split(delimiter)[1:]:
+                if part.startswith(b'--'):
+                    break  # closing delimiter
+                match = _MULTIPART_RE.match(part)
+                if not match:
+                    continue
+                part_headers, value = match.groups()
+                name = _PART_NAME_RE.search(part_headers)
+                if name and b'content-type:' not in part_headers.lower():
+                    field = name.group(1).decode('utf-8')
+                    form_data[field] = _form_value(field, value)
+        
+        return form_data
+    
+    def handle_ai_analysis_request(self, force=False):
         """Handle AI analysis requests"""
         try:
             # Get content length
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length > 0:
-                # Read POST data
-                post_data = self.rfile.read(content_length).decode('utf-8')
-                
-                # Parse form data (simple parsing for multipart/form-data)
-                form_data = {}
-                if 'multipart/form-data' in self.headers.get('Content-Type', ''):
-                    # Parse multipart form data
-                    boundary = self.headers.get('Content-Type').split('boundary=')[1]
-                    parts = post_data.split('--' + boundary)
-                    
-                    for part in parts:
-                        if 'name=' in part and 'Content-Type:' not in part:
-                            lines = part.strip().split('\r\n')
-                            if len(lines) >= 3:
-                                name_line = lines[0]
-                                value = lines[-1]
-                                
-                                if 'name="' in name_line:
-                                    name = name_line.split('name="')[1].split('"')[0]
-                                    form_data[name] = value
+                # Parse form data
+                form_data = self._parse_multipart(content_length)
                 
                 # Call AI analyzer
-                result = self.run_ai_analyzer(form_data)
-                self.send_json_response(result)
+                body = cached_ai_result('analyze', form_data, self.run_ai_analyzer, force)
+                self.send_json_bytes(body)
             else:
                 self.send_error_response('No data received')
                 
@@ -229,31 +757,32 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.send_error_response(f'AI analysis error: {str(e)}')
     
     def run_ai_analyzer(self, form_data):
-        """Run the AI analyzer with form data"""
+        """Run the AI analyzer with form data, flagging analyses written without the LLM"""
+        result = self._analyze_plot(form_data)
+        if isinstance(result.get('analysis'), ai_realtime_analyzer.FallbackText):
+            result['fallback'] = True
+        return result
+    
+    def _analyze_plot(self, form_data):
+        """Build the analysis response for one plot"""
         try:
-            # Import and use the AI analyzer
-            import sys
-            import importlib
-            sys.path.append(os.getcwd())
-            
-            # Force reload the module to get latest changes
-            if 'ai_realtime_analyzer' in sys.modules:
-                importlib.reload(sys.modules['ai_realtime_analyzer'])
-            
-            from ai_realtime_analyzer import RealTimeMicrobiomeAnalyzer
-            
-            analyzer = RealTimeMicrobiomeAnalyzer()
+            analyzer = get_analyzer()
             
             plot_type = form_data.get('plot_type', '')
             taxon_name = form_data.get('taxon_name', '')
             taxonomic_level = form_data.get('taxonomic_level', '')
             
             if plot_type == 'taxon_plot' and taxon_name:
-                # Parse JSON data
-                import json
-                sample_data = json.loads(form_data.get('sample_data', '{}'))
-                sample_names = json.loads(form_data.get('sample_names', '[]'))
-                rpm_values = json.loads(form_data.get('rpm_values', '[]'))
+                # Parse JSON data: one combined payload field, or the older per-field encoding
+                if 'payload' in form_data:
+                    payload = _form_json(form_data, 'payload', '{}')
+                    sample_data = payload.get('sample_data', {})
+                    sample_names = payload.get('sample_names', [])
+                    rpm_values = payload.get('rpm_values', [])
+                else:
+                    sample_data = _form_json(form_data, 'sample_data', '{}')
+                    sample_names = _form_json(form_data, 'sample_names', '[]')
+                    rpm_values = _form_json(form_data, 'rpm_values', '[]')
                 
                 analysis = analyzer.analyze_taxon_plot(taxon_name, sample_data, sample_names, rpm_values)
                 
@@ -367,8 +896,7 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
             if command == 'get_taxa':
                 level = query.get('level', [None])[0]
                 if level:
-                    result = self.run_extract_taxa('get_taxa', level)
-                    self.send_json_response(result)
+                    self.send_extract_result(*self.run_extract_taxa('get_taxa', level))
                 else:
                     self.send_error_response('Missing level parameter')
                     
@@ -376,8 +904,7 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
                 level = query.get('level', [None])[0]
                 taxon = query.get('taxon', [None])[0]
                 if level and taxon:
-                    result = self.run_extract_taxa('get_data', level, taxon)
-                    self.send_json_response(result)
+                    self.send_extract_result(*self.run_extract_taxa('get_data', level, taxon))
                 else:
                     self.send_error_response('Missing level or taxon parameter')
                     
@@ -387,6 +914,47 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
         except Exception as e:
             self.send_error_response(f'Server error: {str(e)}')
     
+    def handle_batch_taxa_request(self):
+        """
+        Answer a JSON array of {command, level, taxon?} taxa queries with a JSON array
+        holding each query's result (or {"error": ...}) in the same order
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            if content_length <= 0:
+                self.send_error_response('No data received')
+                return
+            
+            queries = _json_loads(self.rfile.read(content_length))
+            if not isinstance(queries, list):
+                self.send_error_response('Expected a JSON array of queries')
+                return
+            
+            # Cached result bodies are already encoded, so the array is spliced together as bytes
+            bodies = [self._taxa_query_body(query) for query in queries]
+            self.send_json_bytes(b'[' + b','.join(bodies) + b']')
+            
+        except Exception as e:
+            self.send_error_response(f'Server error: {str(e)}')
+    
+    def _taxa_query_body(self, query):
+        """Return the encoded JSON result of one batched taxa query"""
+        if not isinstance(query, dict):
+            return _ERR_CACHE['Invalid command']
+        
+        command = query.get('command')
+        level = query.get('level')
+        taxon = query.get('taxon')
+        if command == 'get_taxa':
+            if not level:
+                return _ERR_CACHE['Missing level parameter']
+            return self.run_extract_taxa('get_taxa', str(level))[1]
+        if command == 'get_data':
+            if not (level and taxon):
+                return _ERR_CACHE['Missing level or taxon parameter']
+            return self.run_extract_taxa('get_data', str(level), taxon)[1]
+        return _ERR_CACHE['Invalid command']
+    
     def handle_taxa_comparison_request(self, query):
         """Handle requests for taxa comparison tables"""
         try:
@@ -411,50 +979,53 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
         except Exception as e:
             self.send_error_response(f'Server error: {str(e)}')
     
+    def send_not_modified(self, etag, cache_control='public, max-age=300', vary=False):
+        """
+        Answer 304 Not Modified when the client already holds this ETag; vary marks
+        resources whose representation depends on Accept-Encoding
+        """
+        if not self._etag_matches(etag):
+            return False
+        
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', cache_control)
+        if vary:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        return True
+    
     def send_taxa_comparison_tsv(self, level):
         """Send taxa comparison data as TSV"""
         try:
-            # Import and use the AI analyzer
-            import sys
-            import importlib
-            sys.path.append(os.getcwd())
-            
-            # Force reload the module to get latest changes
-            if 'ai_realtime_analyzer' in sys.modules:
-                importlib.reload(sys.modules['ai_realtime_analyzer'])
-            
-            from ai_realtime_analyzer import RealTimeMicrobiomeAnalyzer
-            
-            analyzer = RealTimeMicrobiomeAnalyzer()
-            
             # Map level number to taxonomic level name
-            level_mapping = {
-                "2": "phylum", "3": "class", "4": "order", 
-                "5": "family", "6": "genus", "7": "species"
-            }
-            
-            taxonomic_level = level_mapping.get(level, "family")
+            taxonomic_level = _LEVEL_MAPPING.get(level, "family")
             
-            # Generate TSV content
-            print(f"DEBUG: Calling generate_taxa_comparison_tsv for level: {taxonomic_level}", file=sys.stderr)
-            tsv_content = analyzer.generate_taxa_comparison_tsv(taxonomic_level)
-            print(f"DEBUG: TSV content length: {len(tsv_content) if tsv_content else 0}", file=sys.stderr)
-            print(f"DEBUG: TSV first line: {tsv_content.split(chr(10))[0] if tsv_content else 'None'}", file=sys.stderr)
+            # Generate TSV content (cached per level and input file versions)
+            etag, tsv_content = get_taxa_comparison(taxonomic_level, 'tsv')
             
             if not tsv_content:
                 self.send_error_response('No data available for this taxonomic level')
                 return
             
+            if etag is not None and self.send_not_modified(etag):
+                return
+            
             # Send TSV response
             filename = f"taxa_comparison_{taxonomic_level}.tsv"
             
             self.send_response(200)
             self.send_header('Content-Type', 'text/tab-separated-values')
             self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+            self.send_header('Content-Length', str(len(tsv_content)))
+            if etag is not None:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'public, max-age=300')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
             
-            self.wfile.write(tsv_content.encode('utf-8'))
+            self.wfile.write(tsv_content)
             
         except Exception as e:
             self.send_error_response(f'Error generating TSV: {str(e)}')
@@ -462,118 +1033,128 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
     def send_taxa_comparison_excel(self, level):
         """Send taxa comparison data as Excel"""
         try:
-            # Import and use the AI analyzer
-            import sys
-            import importlib
-            sys.path.append(os.getcwd())
-            
-            # Force reload the module to get latest changes
-            if 'ai_realtime_analyzer' in sys.modules:
-                importlib.reload(sys.modules['ai_realtime_analyzer'])
-            
-            from ai_realtime_analyzer import RealTimeMicrobiomeAnalyzer
-            
-            analyzer = RealTimeMicrobiomeAnalyzer()
-            
             # Map level number to taxonomic level name
-            level_mapping = {
-                "2": "phylum", "3": "class", "4": "order", 
-                "5": "family", "6": "genus", "7": "species"
-            }
-            
-            taxonomic_level = level_mapping.get(level, "family")
+            taxonomic_level = _LEVEL_MAPPING.get(level, "family")
             
-            # Generate Excel content
-            excel_content = analyzer.generate_taxa_comparison_excel(taxonomic_level)
+            # Generate Excel content (cached per level and input file versions)
+            etag, excel_file = get_taxa_comparison(taxonomic_level, 'excel')
+        except Exception as e:
+            self.send_error_response(f'Error generating Excel: {str(e)}')
+            return
+        
+        try:
+            size = len(excel_file) if isinstance(excel_file, bytes) else os.fstat(excel_file.fileno()).st_size
             
-            if not excel_content:
+            if not size:
                 self.send_error_response('No data available for this taxonomic level')
                 return
             
+            if etag is not None and self.send_not_modified(etag):
+                return
+            
             # Send Excel response
             filename = f"taxa_comparison_{taxonomic_level}.xlsx"
             
             self.send_response(200)
             self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+            self.send_header('Content-Length', str(size))
+            if etag is not None:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'public, max-age=300')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
             
-            self.wfile.write(excel_content)
-            
-        except Exception as e:
-            self.send_error_response(f'Error generating Excel: {str(e)}')
+            # The headers are committed now: an error body would corrupt the response,
+            # so a failed transfer just drops the connection
+            try:
+                if isinstance(excel_file, bytes):
+                    self.wfile.write(excel_file)
+                else:
+                    # Hand the open workbook to the kernel with sendfile, after the buffered headers
+                    self.wfile.flush()
+                    self.connection.sendfile(excel_file)
+            except OSError:
+                self.close_connection = True
+        finally:
+            if not isinstance(excel_file, bytes):
+                excel_file.close()
+    
+    def send_extract_result(self, etag, body, gzipped=None):
+        """Send a cached taxa JSON body, or 304 when the client's copy is current"""
+        if etag is not None:
+            # Validate against the ETag of the representation this client would get
+            current = _gzip_etag(etag) if self._use_gzip(len(body)) else etag
+            if self.send_not_modified(current, 'no-cache', vary=len(body) > _GZIP_MIN_SIZE):
+                return
+        self.send_json_bytes(body, etag=etag, gzipped=gzipped)
     
     def run_extract_taxa(self, command, *args):
-        """Run the extract_taxa.py script with given arguments"""
+        """Run an extract_taxa_simple command in-process, memoized per level file version;
+        returns (etag, JSON body bytes, gzipped body), with no ETag for errors"""
         try:
-            cmd = ['python3', 'extract_taxa_simple.py', command] + list(args)
-            result = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd())
-            
-            if result.returncode == 0:
-                # Try to parse as JSON
-                try:
-                    return json.loads(result.stdout.strip())
-                except json.JSONDecodeError:
-                    # If not JSON, return as string
-                    return result.stdout.strip()
-            else:
-                return {'error': result.stderr}
+            if DEV_RELOAD:
+                importlib.reload(extract_taxa_simple)
+                _cached_extract.cache_clear()
+            
+            # Normalize the level the way extract_taxa_simple does ('07' -> 7), so the
+            # cache key and the mtime lookup refer to the file that is actually read
+            level = int(args[0])
+            args = (level, *args[1:])
+            level_file = extract_taxa_simple.LEVEL_FILE_TEMPLATE.format(level)
+            data_mtime = os.path.getmtime(level_file) if os.path.exists(level_file) else None
+            return _cached_extract(command, args, data_mtime)
                 
         except Exception as e:
-            return {'error': str(e)}
+            return None, _json_dumps({'error': str(e)}), None
     
-    def handle_ai_summary_request(self):
+    def handle_ai_summary_request(self, force=False, run_async=False):
         """Handle AI summary generation requests"""
         try:
             # Get content length
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length > 0:
-                # Read POST data
-                post_data = self.rfile.read(content_length).decode('utf-8')
-                
-                # Parse form data (simple parsing for multipart/form-data)
-                form_data = {}
-                if 'multipart/form-data' in self.headers.get('Content-Type', ''):
-                    # Parse multipart form data
-                    boundary = self.headers.get('Content-Type').split('boundary=')[1]
-                    parts = post_data.split('--' + boundary)
-                    
-                    for part in parts:
-                        if 'name=' in part and 'Content-Type:' not in part:
-                            lines = part.strip().split('\r\n')
-                            if len(lines) >= 3:
-                                name_line = lines[0]
-                                value = lines[-1]
-                                
-                                if 'name="' in name_line:
-                                    name = name_line.split('name="')[1].split('"')[0]
-                                    form_data[name] = value
+                # Parse form data
+                form_data = self._parse_multipart(content_length)
                 
                 # Call AI summary generator
-                result = self.run_ai_summary_generator(form_data)
-                self.send_json_response(result)
+                if run_async:
+                    job_id = submit_ai_job(cached_ai_result, 'summary', form_data,
+                                           self.run_ai_summary_generator, force)
+                    self.send_json_response({'success': True, 'job_id': job_id}, status=202)
+                    return
+                
+                body = cached_ai_result('summary', form_data, self.run_ai_summary_generator, force)
+                self.send_json_bytes(body)
             else:
                 self.send_error_response('No data received')
                 
         except Exception as e:
             self.send_error_response(f'AI summary error: {str(e)}')
     
+    def handle_ai_job_request(self, query):
+        """Report a background AI job: 202 while it runs, then its result once"""
+        job_id = query.get('id', [''])[0]
+        with _JOBS_LOCK:
+            job = _JOBS.get(job_id)
+            if job is not None and job[1].done():
+                del _JOBS[job_id]
+        
+        if job is None:
+            self.send_json_response({'success': False, 'error': 'Unknown job id'}, status=404)
+        elif not job[1].done():
+            self.send_json_response({'success': True, 'status': 'pending'}, status=202)
+        else:
+            try:
+                body = job[1].result()
+            except Exception as e:
+                body = _json_dumps({'success': False, 'error': str(e)})
+            self.send_json_bytes(body)
+    
     def run_ai_summary_generator(self, form_data):
         """Run the AI summary generator with form data"""
         try:
-            # Import and use the AI analyzer
-            import sys
-            import importlib
-            sys.path.append(os.getcwd())
-            
-            # Force reload the module to get latest changes
-            if 'ai_realtime_analyzer' in sys.modules:
-                importlib.reload(sys.modules['ai_realtime_analyzer'])
-            
-            from ai_realtime_analyzer import RealTimeMicrobiomeAnalyzer
-            
-            analyzer = RealTimeMicrobiomeAnalyzer()
+            analyzer = get_analyzer()
             
             taxonomic_level = form_data.get('taxonomic_level', '')
             report_type = form_data.get('report_type', 'technical')
@@ -589,11 +1170,8 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
             
             # Generate PDF report
             try:
-                # Import the PDF generation function
-                import sys
-                sys.path.append(os.path.join(os.getcwd(), 'cgi-bin'))
-                
-                # Import the PDF creation function from ai_summary.py
+                # Import the PDF creation function from ai_summary.py (loaded on first use,
+                # since it pulls in matplotlib and reportlab)
                 from ai_summary import create_pdf_report
                 
                 # Create PDF
@@ -601,15 +1179,17 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
                 
                 if pdf_content:
                     # Encode PDF content
-                    import base64
                     pdf_base64 = base64.b64encode(pdf_content).decode('utf-8')
                     
-                    return {
+                    result = {
                         'success': True,
                         'message': f'AI summary generated successfully for {taxonomic_level} level',
                         'report_type': report_type,
                         'pdf_data': pdf_base64
                     }
+                    if isinstance(ai_summary, ai_realtime_analyzer.FallbackText):
+                        result['fallback'] = True
+                    return result
                 else:
                     return {'success': False, 'error': 'Failed to generate PDF'}
                     
@@ -620,51 +1200,101 @@ class TaxaRequestHandler(http.server.SimpleHTTPRequestHandler):
                     'success': True,
                     'message': f'AI summary generated successfully for {taxonomic_level} level (text only)',
                     'report_type': report_type,
-                    'summary': ai_summary
+                    'summary': ai_summary,
+                    'fallback': True
                 }
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def send_json_response(self, data):
+    def send_json_response(self, data, status=200):
         """Send JSON response"""
-        self.send_response(200)
+        self.send_json_bytes(_json_dumps(data), status)
+    
+    def send_json_bytes(self, payload, status=200, etag=None, gzipped=None):
+        """
+        Send an already encoded JSON body, gzipped when it is large and the client accepts
+        it; etag validates the identity body and gets a -gzip suffix for the encoded one
+        """
+        self.send_response(status)
         self.send_header('Content-type', 'application/json')
+        if len(payload) > _GZIP_MIN_SIZE:
+            self.send_header('Vary', 'Accept-Encoding')
+            if self._use_gzip(len(payload)):
+                payload = gzipped if gzipped is not None else gzip.compress(payload, 1, mtime=0)
+                self.send_header('Content-Encoding', 'gzip')
+                if etag is not None:
+                    etag = _gzip_etag(etag)
+        self.send_header('Content-Length', str(len(payload)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        
-        if isinstance(data, str):
-            # If data is a string, try to parse it as JSON
-            try:
-                json_data = json.loads(data)
-                self.wfile.write(json.dumps(json_data).encode())
-            except json.JSONDecodeError:
-                # If it's not JSON, wrap it in a response object
-                response = {'result': data}
-                self.wfile.write(json.dumps(response).encode())
-        else:
-            self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(payload)
+    
+    def _use_gzip(self, size):
+        """True when a JSON body of this size goes to this client gzipped"""
+        return size > _GZIP_MIN_SIZE and 'gzip' in self.headers.get('Accept-Encoding', '')
     
     def send_error_response(self, message):
         """Send error response"""
-        self.send_response(400)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
-        error_response = {'error': message}
-        self.wfile.write(json.dumps(error_response).encode())
+        payload = _ERR_CACHE.get(message) or _json_dumps({'error': message})
+        self.send_json_bytes(payload, 400)
 
-def main():
-    """Main function to start the server"""
-    PORT = 8001
+class PooledHTTPServer(http.server.ThreadingHTTPServer):
+    """HTTP server that hands each request to a bounded pool of worker threads"""
+    allow_reuse_address = True
+    
+    def __init__(self, server_address, handler_class, max_workers=None):
+        # Set up before binding: a failed bind calls server_close from the base __init__
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='taxa-worker')
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+        super().__init__(server_address, handler_class)
+    
+    def get_request(self):
+        request, client_address = super().get_request()
+        # Let the kernel reap keep-alive connections whose client vanished
+        request.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        with self._connections_lock:
+            self._connections.add(request)
+        return request, client_address
+    
+    def shutdown_request(self, request):
+        with self._connections_lock:
+            self._connections.discard(request)
+        super().shutdown_request(request)
     
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+    
+    def server_close(self):
+        super().server_close()
+        # Wake workers parked on idle keep-alive connections; the pool threads are joined
+        # at exit, so otherwise Ctrl-C waits out the handler's read timeout
+        with self._connections_lock:
+            connections = list(self._connections)
+        for request in connections:
+            with contextlib.suppress(OSError):
+                request.shutdown(socket.SHUT_RDWR)
+        # Drop queued requests so Ctrl-C does not wait for the backlog to drain
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+def run(port=8001, workers=None):
+    """
+    Serve the interface and API on the given port until interrupted; other entry
+    points (e.g. a second instance on another port) reuse this instead of a copy
+    
+    Args:
+        port (int): TCP port to listen on
+        workers (int): Size of the request worker pool (defaults to the executor's)
+    """
     # Change to the directory containing this script
-    script_dir = Path(__file__).parent
-    os.chdir(script_dir)
+    os.chdir(_BASE)
     
-    with socketserver.TCPServer(("", PORT), TaxaRequestHandler) as httpd:
-        print(f"Server running at http://localhost:{PORT}")
+    with PooledHTTPServer(("", port), TaxaRequestHandler, max_workers=workers) as httpd:
+        print(f"Server running at http://localhost:{port}")
         print(f"Open index_ai_enhanced.html in your browser to use the interface")
         print("Press Ctrl+C to stop the server")
         try:
@@ -673,5 +1303,14 @@ def main():
             print("\nShutting down server...")
             httpd.shutdown()
 
+def main():
+    """Main function to start the server"""
+    PORT = int(os.environ.get('SERVER_PORT', 8001))
+    # Handlers mostly wait on sockets, files and the LLM, so size the pool like an
+    # I/O-bound executor rather than by core count
+    WORKERS = int(os.environ.get('SERVER_WORKERS', min(32, (os.cpu_count() or 1) + 4)))
+    
+    run(PORT, WORKERS)
+
 if __name__ == "__main__":
     main()
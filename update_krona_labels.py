@@ -4,9 +4,64 @@ Update Krona HTML file to replace SRR dataset labels with sample names from meta
 This script runs automatically when the webpage loads to ensure labels are always correct.
 """
 
-import pandas as pd
+import contextlib
+import csv
+import mmap
 import re
 import os
+import shutil
+import tempfile
+
+def rewrite_dataset_labels(krona_file, pattern, labels):
+    """
+    Substitute dataset labels in the Krona file without loading it into memory.
+
+    Equal-length replacements are patched in place through the memory map;
+    otherwise the result is streamed to a temp file that atomically replaces
+    the original.
+
+    Args:
+        krona_file (str): Path to the Krona HTML file
+        pattern (re.Pattern): Bytes pattern whose first group is the SRR accession
+        labels (dict): Maps SRR accession bytes to the replacement label bytes
+
+    Returns:
+        int: Number of labels replaced
+    """
+    if os.path.getsize(krona_file) == 0:
+        return 0
+
+    with open(krona_file, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm:
+        matches = [(m.start(), m.end(), labels[m.group(1)]) for m in pattern.finditer(mm)]
+        if not matches:
+            return 0
+
+        if all(end - start == len(label) for start, end, label in matches):
+            for start, end, label in matches:
+                mm[start:end] = label
+            mm.flush()
+            return len(matches)
+
+        fd, temp_file = tempfile.mkstemp(
+            prefix=os.path.basename(krona_file) + '.', suffix='.tmp',
+            dir=os.path.dirname(os.path.abspath(krona_file)),
+        )
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                pos = 0
+                for start, end, label in matches:
+                    out.write(mm[pos:start])
+                    out.write(label)
+                    pos = end
+                out.write(mm[pos:])
+            shutil.copymode(krona_file, temp_file)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_file)
+            raise
+
+    os.replace(temp_file, krona_file)
+    return len(matches)
 
 def update_krona_labels():
     """
@@ -26,35 +81,30 @@ def update_krona_labels():
         return False
     
     try:
-        # Read metadata
-        metadata_df = pd.read_csv(metadata_file, sep='\t')
-        
-        # Create mapping from SRR to sample name
-        srr_to_sample = {}
-        for _, row in metadata_df.iterrows():
-            sample_name = row['sample']
-            srr_accession = row['srr'].strip()
-            srr_to_sample[srr_accession] = sample_name
+        # Read metadata and map each SRR accession to its sample name
+        with open(metadata_file, newline='', encoding='utf-8') as f:
+            srr_to_sample = {
+                row['srr'].strip(): row['sample']
+                for row in csv.DictReader(f, delimiter='\t')
+            }
         
         print(f"SRR to Sample mapping: {srr_to_sample}")
         
-        # Read the Krona HTML file
-        with open(krona_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Replace each SRR dataset label with the corresponding sample name
-        original_content = content
+        # Replace every SRR dataset label in a single pass over the mapped file
+        if srr_to_sample:
+            pattern = re.compile(
+                b'<dataset>('
+                + b'|'.join(re.escape(srr.encode('utf-8')) for srr in srr_to_sample)
+                + b')_krona</dataset>'
+            )
+            labels = {
+                srr.encode('utf-8'): f'<dataset>{sample}</dataset>'.encode('utf-8')
+                for srr, sample in srr_to_sample.items()
+            }
+            rewrite_dataset_labels(krona_file, pattern, labels)
+
         for srr, sample in srr_to_sample.items():
-            # Replace the dataset label
-            old_label = f'<dataset>{srr}_krona</dataset>'
-            new_label = f'<dataset>{sample}</dataset>'
-            content = content.replace(old_label, new_label)
-            
-            print(f"  Replaced: {old_label} → {new_label}")
-        
-        # Write the updated content back to the file
-        with open(krona_file, 'w', encoding='utf-8') as f:
-            f.write(content)
+            print(f"  Replaced: <dataset>{srr}_krona</dataset> → <dataset>{sample}</dataset>")
         
         print(f"✅ Successfully updated {krona_file}")
         return True